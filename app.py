@@ -1,26 +1,49 @@
+import logging
 import os
 import uvicorn
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from google.adk.cli.fast_api import get_fast_api_app
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+from session_store import prepare_session_db, sqlite_path_from_url, start_compaction_thread
+from multi_tools_agent.agent import root_agent
+from multi_tools_agent.tools.admission import AdmissionMiddleware
+from multi_tools_agent.tools.audio_cache import audio_cache
+from multi_tools_agent.tools.clients import warm_up
+from multi_tools_agent.tools.logging_config import LOG_LEVEL, configure_logging
+from multi_tools_agent.tools.metrics import cache_stats_collector
+from multi_tools_agent.tools.tts_stream import is_pending_clip, is_valid_clip_id, stream_clip, stream_url
 #from typing import Literal
 #from pydantic import BaseModel
 
 #from pathlib import Path
 
+# Structured logs through a background writer; gunicorn.conf.py restarts it in each worker
+configure_logging()
+logger = logging.getLogger("app")
+
 # Set up paths
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 AGENT_DIR = BASE_DIR  # Parent directory containing backend_multi_tool_agent
 
-# Set up DB path for sessions
+# Clips are content-addressed, so a given clip ID never changes
+AUDIO_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Set up DB path for sessions. ADK serves sqlite:// URLs with its
+# SqliteSessionService, which opens a short-lived aiosqlite connection per
+# operation (no connection pool); session_store.py works on its schema.
 SESSION_DB_URL = f"sqlite:///{os.path.join(BASE_DIR, 'sessions.db')}"
 
-print(f"Base Directory: {BASE_DIR}")
-print(f"Agent Directory: {AGENT_DIR}")
-print(f"Session DB URL: {SESSION_DB_URL}")
+logger.info("Base Directory: %s", BASE_DIR)
+logger.info("Agent Directory: %s", AGENT_DIR)
+logger.info("Session DB URL: %s", SESSION_DB_URL)
 
 
-# Get session service URI from environment variables
+# Get session service URI from environment variables; default to the local
+# SQLite store unless SESSION_STORE=memory is requested explicitly
 session_uri = os.getenv("SESSION_SERVICE_URI", None)
+if not session_uri and os.getenv("SESSION_STORE", "sqlite") != "memory":
+    session_uri = SESSION_DB_URL
 
 # Prepare arguments for get_fast_api_app
 app_args = {"agents_dir": AGENT_DIR, "web": True}
@@ -28,15 +51,25 @@ app_args = {"agents_dir": AGENT_DIR, "web": True}
 # Only include session_service_uri if it's provided
 if session_uri:
     app_args["session_service_uri"] = session_uri
+    session_db_path = sqlite_path_from_url(session_uri)
+    if session_db_path:
+        prepare_session_db(session_db_path)
+        start_compaction_thread(session_db_path)
 else:
-#    logger.log_text(
-    print(
-        "SESSION_SERVICE_URI not provided. Using in-memory session service instead. "
-        "All sessions will be lost when the server restarts.",
-        )
+    logger.warning(
+        "SESSION_STORE=memory. Using in-memory session service instead. "
+        "All sessions will be lost when the server restarts, and with several "
+        "workers a session only exists in the worker that created it."
+    )
+
+# Optionally pay SDK import and client construction costs before the first request
+if os.getenv("AGENT_WARMUP", "false").lower() == "true":
+    warm_up()
 
 # Create FastAPI app with appropriate arguments
 app: FastAPI = get_fast_api_app(**app_args)
+# Per-user rate limit and in-flight cap on /run and /run_sse; saturated requests get a fast 429/503 with Retry-After
+app.add_middleware(AdmissionMiddleware)
 
 app.title = "-backend-service"
 app.description = "API for interacting with the Support Agent root-agent"
@@ -60,22 +93,68 @@ async def health_check():
 
 @app.get("/agent-info")
 async def agent_info(request: Request):
-#    """Provide agent information"""
-    from backend_multi_tools_agent import root_agent
-
+    """Provide agent information"""
     return {
         "agent_name": root_agent.name,
         "description": root_agent.description,
         "model": root_agent.model,
     }
 
+@app.get("/tts/stream/{clip_id}")
+async def tts_stream(clip_id: str):
+    """Stream a get_voice_response clip as MP3 frames arrive from ElevenLabs"""
+    chunks = stream_clip(clip_id)
+    if chunks is None:
+        raise HTTPException(status_code=404, detail=f"Unknown audio clip: {clip_id}")
+    return StreamingResponse(chunks, media_type="audio/mpeg")
+
+@app.get("/audio/{clip_id}")
+async def get_audio(clip_id: str, request: Request):
+    """Serve a synthesized clip by ID with Range, ETag/If-None-Match and long-lived cache headers; 202 while it is still streaming"""
+    if not is_valid_clip_id(clip_id):
+        raise HTTPException(status_code=404, detail=f"Unknown audio clip: {clip_id}")
+
+    etag = f'"{clip_id}"'
+    headers = {"ETag": etag, "Cache-Control": AUDIO_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    clip_path = audio_cache.get(clip_id)
+    if clip_path is None:
+        # Not synthesized yet (streaming mode). Synthesis only runs behind the
+        # stream URL, where concurrent fetches share a single synthesis.
+        if is_pending_clip(clip_id):
+            return JSONResponse(
+                {"detail": f"Audio clip {clip_id} is not synthesized yet"},
+                status_code=202,
+                headers={"Location": stream_url(clip_id), "Retry-After": "2", "Cache-Control": "no-store"},
+            )
+        raise HTTPException(status_code=404, detail=f"Unknown audio clip: {clip_id}")
+
+    # FileResponse answers Range requests with 206 and uses zero-copy
+    # pathsend when the ASGI server supports it
+    return FileResponse(clip_path, media_type="audio/mpeg", headers=headers)
+
+@app.get("/metrics")
+async def metrics():
+    """Expose Prometheus metrics: tool/upstream latency histograms, errors, in-flight gauges, cache ratios"""
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Aggregate the metric files every gunicorn worker writes
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(cache_stats_collector)
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
 
 if __name__ == "__main__":
-    print("Starting FastAPI server...")
+    # Single-process development server; production runs `gunicorn app:app` (see gunicorn.conf.py)
+    logger.info("Starting FastAPI server...")
     uvicorn.run(
         app, 
         host="0.0.0.0", 
         port=9999, 
         reload=False,
-        log_level="debug"
+        log_level=LOG_LEVEL.lower()
     )
@@ -30,12 +30,14 @@ API Assumptions:
 1. ADK API Server runs on localhost:8000
 2. Speaker Agent is registered with app_name="speaker"
 3. The Speaker Agent uses ElevenLabs TTS and saves audio files locally
-4. Audio files are accessible from the path returned in the API response
+4. Audio clips are served by the backend at the /audio/<clip_id> (or /tts/stream/<clip_id>) URL returned in the API response
 5. Responses follow the ADK event structure with model outputs and function calls/responses
 
 """
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import os
 import uuid
@@ -64,6 +66,9 @@ voice_character_list={
     "bIHbv24MWmeRgasZH58o":"Will-male,young,American,friendly,social-media",
 }
 
+# Must match ALLOWED_OUTPUT_FORMATS in multi_tools_agent/tools/voice_settings.py; lower bitrates suit slow links
+VOICE_OUTPUT_FORMATS = ["mp3_44100_192", "mp3_44100_128", "mp3_44100_96", "mp3_44100_64", "mp3_44100_32", "mp3_22050_32"]
+
     
 def voice_character_format_func(option):
     return voice_character_list[option]
@@ -78,6 +83,95 @@ st.set_page_config(
 # Constants
 API_BASE_URL = os.getenv("API_BASE_URL","http://localhost:8000")
 APP_NAME = os.environ.get("AGENT_APP_NAME","multi_tools_agent")
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_TIMEOUT = (float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")), float(os.getenv("HTTP_READ_TIMEOUT", "120")))
+# Only the latest messages are rendered on each rerun; older ones are revealed a page at a time
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+AUDIO_CACHE_MAX_CLIPS = int(os.getenv("AUDIO_CACHE_MAX_CLIPS", "200"))
+
+class BackendRetry(Retry):
+    """Retry policy that only retries a POST on 503, which the backend's admission control sends before running anything."""
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method.upper() == "POST" and status_code != 503:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+@st.cache_resource
+def get_http_session():
+    """
+    Create the keep-alive HTTP session shared by every rerun and user of this Streamlit process.
+    
+    Connection errors are retried with exponential backoff (honouring Retry-After),
+    and so are 502/503/504 responses to GETs. A POST is only retried on 503: a
+    502/504 can arrive after the agent run started, and read errors are never
+    retried, so a message is never sent twice.
+    """
+    retry = BackendRetry(
+        total=HTTP_MAX_RETRIES,
+        connect=HTTP_MAX_RETRIES,
+        read=0,
+        status=HTTP_MAX_RETRIES,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "POST"}),
+        backoff_factor=0.5,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_data(max_entries=AUDIO_CACHE_MAX_CLIPS, show_spinner=False)
+def load_clip_bytes(clip_id, _audio_path=None):
+    """
+    Load a clip's MP3 bytes once per Streamlit process, keyed by clip ID.
+    
+    Clips are content-addressed, so the bytes never change; reruns replay past
+    messages from memory instead of reading the file or refetching it. The local
+    file is used when this app shares the backend's output directory, otherwise
+    the clip is downloaded from the backend /audio endpoint. The leading
+    underscore keeps _audio_path out of the cache key.
+    
+    Returns:
+        bytes: the clip
+    
+    Raises:
+        FileNotFoundError: the clip is not available (yet); failures are not cached
+    """
+    if _audio_path and os.path.exists(_audio_path):
+        with open(_audio_path, "rb") as f:
+            return f.read()
+    try:
+        response = get_http_session().get(f"{API_BASE_URL}/audio/{clip_id}", timeout=HTTP_TIMEOUT)
+    except requests.RequestException as e:
+        raise FileNotFoundError(clip_id) from e
+    # 202 while a streamed clip is still being synthesized; it plays from its stream URL meanwhile
+    if response.status_code != 200:
+        raise FileNotFoundError(clip_id)
+    return response.content
+
+def render_audio(msg, fresh=False):
+    """
+    Render the audio player of an assistant message.
+    
+    A fresh message plays from its backend URL so a streamed clip starts before
+    synthesis ends; past messages play from the per-process bytes cache.
+    """
+    if fresh and msg.get("audio_url"):
+        st.audio(msg["audio_url"], format="audio/mpeg")
+        return
+    if not msg.get("clip_id"):
+        return
+    try:
+        st.audio(load_clip_bytes(msg["clip_id"], msg.get("audio_path")), format="audio/mpeg")
+    except FileNotFoundError:
+        if msg.get("audio_url"):
+            st.audio(msg["audio_url"], format="audio/mpeg")
+        else:
+            st.warning(f"Audio file not accessible: <{msg.get('audio_path')}>")
 
 # Initialize session state variables
 if "user_id" not in st.session_state:
@@ -92,6 +186,9 @@ if "messages" not in st.session_state:
 if "audio_files" not in st.session_state:
     st.session_state.audio_files = []
 
+if "history_pages" not in st.session_state:
+    st.session_state.history_pages = 1
+
 def create_session():
     """
     Create a new session with the speaker agent.
@@ -108,43 +205,51 @@ def create_session():
         POST /apps/{app_name}/users/{user_id}/sessions/{session_id}
     """
     session_id = f"session-{int(time.time())}"
-    response = requests.post(
-        f"{API_BASE_URL}/apps/{APP_NAME}/users/{st.session_state.user_id}/sessions/{session_id}",
-        headers={"Content-Type": "application/json"},
-        data=json.dumps({})
-    )
+    try:
+        response = get_http_session().post(
+            f"{API_BASE_URL}/apps/{APP_NAME}/users/{st.session_state.user_id}/sessions/{session_id}",
+            headers={"Content-Type": "application/json"},
+            data=json.dumps({}),
+            timeout=HTTP_TIMEOUT
+        )
+    except requests.RequestException as e:
+        st.error(f"Failed to create session: {e}")
+        return False
     
     if response.status_code == 200:
         st.session_state.session_id = session_id
         st.session_state.messages = []
         st.session_state.audio_files = []
+        st.session_state.history_pages = 1
         return True
     else:
         st.error(f"Failed to create session: {response.text}")
         return False
 
-def send_message(message):
+def send_message(message, voice_state=None):
     """
-    Send a message to the speaker agent and process the response.
+    Send a message to the speaker agent and stream the response as it is produced.
     
     This function:
-    1. Adds the user message to the chat history
-    2. Sends the message to the ADK API
-    3. Processes the response to extract text and audio information
-    4. Updates the chat history with the assistant's response
+    1. Adds the user message to the chat history and renders it
+    2. Sends the message, with the voice preferences as a session state delta, to the ADK server-sent-events endpoint
+    3. Renders partial model text and tool progress as events arrive
+    4. Updates the chat history with the assistant's final response
     
     Args:
         message (str): The user's message to send to the agent
+        voice_state (dict): Voice ID, voice settings and output format stored in the session state
         
     Returns:
         bool: True if message was sent and processed successfully, False otherwise
     
     API Endpoint:
-        POST /run
+        POST /run_sse (with "streaming": true)
         
     Response Processing:
-        - Parses the ADK event structure to extract text responses
-        - Looks for text_to_speech function responses to find audio file paths
+        - Each "data:" line carries one ADK event; partial events hold text deltas
+        - Function calls and responses are shown as tool progress
+        - Looks for get_voice_response function responses to find audio file paths
         - Adds both text and audio information to the chat history
     """
     if not st.session_state.session_id:
@@ -153,52 +258,102 @@ def send_message(message):
     
     # Add user message to chat
     st.session_state.messages.append({"role": "user", "content": message})
+    st.chat_message("user").write(message)
     
     # Send message to API
-    response = requests.post(
-        f"{API_BASE_URL}/run",
-        headers={"Content-Type": "application/json"},
-        data=json.dumps({
-            "app_name": APP_NAME,
-            "user_id": st.session_state.user_id,
-            "session_id": st.session_state.session_id,
-            "new_message": {
-                "role": "user",
-                "parts": [{"text": message}]
-            }
-        })
-    )
+    try:
+        response = get_http_session().post(
+            f"{API_BASE_URL}/run_sse",
+            headers={"Content-Type": "application/json", "Accept": "text/event-stream"},
+            data=json.dumps({
+                "app_name": APP_NAME,
+                "user_id": st.session_state.user_id,
+                "session_id": st.session_state.session_id,
+                "new_message": {
+                    "role": "user",
+                    "parts": [{"text": message}]
+                },
+                "state_delta": voice_state,
+                "streaming": True
+            }),
+            stream=True,
+            timeout=HTTP_TIMEOUT
+        )
+    except requests.RequestException as e:
+        st.error(f"Error: {e}")
+        return False
     
     if response.status_code != 200:
         st.error(f"Error: {response.text}")
         return False
     
-    # Process the response
-    events = response.json()
-    
     # Extract assistant's text response
     assistant_message = None
+    streamed_text = ""
     audio_file_path = None
+    audio_clip_url = None
+    clip_id = None
     
-    for event in events:
-        # Look for the final text response from the model
-        if event.get("content", {}).get("role") == "model" and "text" in event.get("content", {}).get("parts", [{}])[0]:
-            assistant_message = event["content"]["parts"][0]["text"]
+    with st.chat_message("assistant"):
+        tool_progress = st.empty()
+        text_placeholder = st.empty()
+        
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            event = json.loads(line[len("data:"):].strip())
+            if "error" in event:
+                st.error(f"Error: {event['error']}")
+                break
+            
+            for part in event.get("content", {}).get("parts", []):
+                # Partial events carry text deltas; the final event repeats the full text
+                if event.get("content", {}).get("role") == "model" and "text" in part:
+                    if event.get("partial"):
+                        streamed_text += part["text"]
+                        text_placeholder.markdown(streamed_text + "▌")
+                    else:
+                        assistant_message = part["text"]
+                        streamed_text = ""
+                        text_placeholder.markdown(assistant_message)
+                
+                if "functionCall" in part:
+                    tool_progress.caption(f"⏳ Running `{part['functionCall'].get('name')}`...")
+                
+                # Look for text_to_speech function response to extract audio file path
+                if "functionResponse" in part:
+                    func_response = part["functionResponse"]
+                    tool_progress.caption(f"✅ `{func_response.get('name')}` done")
+                    if func_response.get("name") == "get_voice_response":
+                        response_text = func_response.get("response", {}).get("result", {}).get("content", [{}])[0].get("text", "")
+                        # Extract file path using simple string parsing
+                        if "saved at:" in response_text:
+                            parts = response_text.split("saved at:")[1].strip().split()
+                            if parts:
+                                audio_file_path = parts[0].strip(".")
+                        # Clips are fetched from the backend; streamed clips can be played before synthesis ends
+                        for marker in ("audio at:", "stream at:"):
+                            if marker in response_text:
+                                parts = response_text.split(marker)[1].strip().split()
+                                if parts:
+                                    audio_clip_url = f"{API_BASE_URL}{parts[0]}"
+                                    clip_id = parts[0].rstrip("/").rsplit("/", 1)[-1]
         
-        # Look for text_to_speech function response to extract audio file path
-        if "functionResponse" in event.get("content", {}).get("parts", [{}])[0]:
-            func_response = event["content"]["parts"][0]["functionResponse"]
-            if func_response.get("name") == "get_voice_response":
-                response_text = func_response.get("response", {}).get("result", {}).get("content", [{}])[0].get("text", "")
-                # Extract file path using simple string parsing
-                if "saved at:" in response_text:
-                    parts = response_text.split("saved at:")[1].strip().split()
-                    if parts:
-                        audio_file_path = parts[0].strip(".")
+        tool_progress.empty()
+        if not assistant_message and streamed_text:
+            assistant_message = streamed_text
+            text_placeholder.markdown(assistant_message)
+        
+        if audio_file_path and not clip_id:
+            # Clips are saved as <clip_id>.mp3
+            clip_id = os.path.splitext(os.path.basename(audio_file_path))[0]
+        message_entry = {"role": "assistant", "content": assistant_message, "audio_path": audio_file_path, "audio_url": audio_clip_url, "clip_id": clip_id}
+        if assistant_message:
+            render_audio(message_entry, fresh=True)
     
-    # Add assistant response to chat
+    # Add assistant response to chat; it is already on screen, so no rerun is needed
     if assistant_message:
-        st.session_state.messages.append({"role": "assistant", "content": assistant_message, "audio_path": audio_file_path})
+        st.session_state.messages.append(message_entry)
     
     return True
 
@@ -217,7 +372,7 @@ with st.sidebar:
     
     #st.divider()
 
-    st.header("Voice Settings (To Develop)")
+    st.header("Voice Settings")
     voice_character_option = st.selectbox("select voice character:",
         list(voice_character_list.keys()), format_func=voice_character_format_func
     )
@@ -225,43 +380,47 @@ with st.sidebar:
     voice_use_speaker_boost=st.radio('Use Speaker Boost>', [True, False], horizontal=True)
     voice_similarity_boost = st.slider('Similarity Boost>', 0.0, 1.0, 0.75)
     voice_style = st.slider('Style>', 0.0, 1.0, 0.0)
-    voice_speed = st.slider('Speed>', 0.0, 1.0, 1.0)
+    voice_speed = st.slider('Speed>', 0.7, 1.2, 1.0)
+    voice_output_format = st.selectbox('Audio Quality>', VOICE_OUTPUT_FORMATS, index=1)
+    # Read by get_voice_response from the session state, so the prompt only carries the user's text
+    voice_state = {
+        "voice_id": voice_character_option,
+        "voice_settings": {
+            "stability": voice_stability,
+            "similarity_boost": voice_similarity_boost,
+            "style": voice_style,
+            "speed": voice_speed,
+            "use_speaker_boost": voice_use_speaker_boost,
+        },
+        "voice_output_format": voice_output_format,
+    }
 
 
 
 # Chat interface
 st.subheader("Conversation")
 
-# Display messages
-for msg in st.session_state.messages:
+# Display the latest page(s) of messages; rerun cost no longer grows with the conversation
+def show_earlier_messages():
+    st.session_state.history_pages += 1
+
+hidden_count = len(st.session_state.messages) - HISTORY_PAGE_SIZE * st.session_state.history_pages
+if hidden_count > 0:
+    st.button(f"⬆️ Show {min(hidden_count, HISTORY_PAGE_SIZE)} earlier messages", key="show_earlier", on_click=show_earlier_messages)
+for msg in st.session_state.messages[max(hidden_count, 0):]:
     if msg["role"] == "user":
         st.chat_message("user").write(msg["content"])
     else:
         with st.chat_message("assistant"):
             st.write(msg["content"])
-            
-            # Handle audio if available
-            if "audio_path" in msg and msg["audio_path"]:
-                audio_path = msg["audio_path"]
-                print(f"audio_path_extracted<{audio_path}>")
-                if os.path.exists(audio_path):
-                    st.audio(audio_path)
-                else:
-                    #temporary fix
-                    default_audio_path="output/audio-test.mp3"
-                    if os.path.exists(default_audio_path):
-                        st.audio(default_audio_path)
-                    else:
-                        st.warning(f"Audio file not accessible: <{audio_path}>")
+            render_audio(msg)
 
-last_user_message = ""
 # Input for new messages
 if st.session_state.session_id:  # Only show input if session exists
     user_input = st.chat_input("Type your message...")
-    if user_input is not None and last_user_message != user_input:
-        send_message(user_input+f" with voice_id:{voice_character_option}")
-        last_user_message = user_input
-        st.rerun()  # Rerun to update the UI with new messages
+    if user_input:
+        # send_message renders the exchange in place below the history
+        send_message(user_input, voice_state)
 else:
     st.info("👈 Create a session to start chatting")
     st.write(f"Current Voice Character option: {voice_character_option} attributes: {voice_character_format_func(voice_character_option)}")
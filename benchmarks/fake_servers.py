@@ -0,0 +1,155 @@
+"""
+Local stand-ins for the Gemini and ElevenLabs APIs used by the offline benchmarks.
+
+FakeGemini answers generateContent / streamGenerateContent with canned replies:
+it issues the function calls a user message asks for ("weather in X", "time in X",
+"say out loud ...") one model step at a time, then a final text answer.
+FakeElevenLabs answers text-to-speech convert/stream requests with silent MPEG
+frames sized to the text. Both add a configurable latency per request.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+from urllib.parse import urlparse
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, no padding: 417-byte frames of ~26 ms
+MP3_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+MP3_FRAMES_PER_CHAR = 2
+
+_CITY_PATTERN = r"in ([A-Z][\w]*(?: [A-Z][\w]*)*)"
+
+
+def plan_function_calls(message: str) -> List[dict]:
+    """The function calls a real model would issue for one of the benchmark messages."""
+    calls = []
+    weather = re.search(r"weather " + _CITY_PATTERN, message)
+    if weather:
+        calls.append({"name": "get_weather", "args": {"city": weather.group(1)}})
+    current_time = re.search(r"time " + _CITY_PATTERN, message)
+    if current_time:
+        calls.append({"name": "get_current_time", "args": {"city": current_time.group(1)}})
+    if "say out loud" in message.lower():
+        calls.append({"name": "get_voice_response", "args": {"text": f"Here is your answer: {message}"}})
+    return calls
+
+
+def _last_user_turn(contents: List[dict]) -> Tuple[str, int]:
+    # Returns the last user text and the number of function responses after it.
+    message, responses = "", 0
+    for content in contents:
+        for part in content.get("parts", []):
+            if "text" in part and content.get("role") == "user":
+                message, responses = part["text"], 0
+            elif "functionResponse" in part:
+                responses += 1
+    return message, responses
+
+
+def gemini_reply(request: dict) -> dict:
+    contents = request.get("contents", [])
+    message, responses = _last_user_turn(contents)
+    generation_config = request.get("generationConfig", {})
+    if generation_config.get("responseMimeType") == "application/json":
+        parts = [{"text": "[]"}]
+    elif "tools" not in request:
+        # Plain prompt, e.g. translate_response or the conversation summary
+        max_chars = generation_config.get("maxOutputTokens", len(message)) * 4
+        parts = [{"text": f"(translated) {message}"[:max_chars]}]
+    else:
+        calls = plan_function_calls(message)
+        if responses < len(calls):
+            parts = [{"functionCall": calls[responses]}]
+        else:
+            parts = [{"text": f"Here is what I found for: {message}"}]
+    prompt_tokens = len(json.dumps(request)) // 4
+    return {
+        "candidates": [{"content": {"role": "model", "parts": parts}, "finishReason": "STOP", "index": 0}],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": 20,
+            "totalTokenCount": prompt_tokens + 20,
+        },
+        "modelVersion": "fake-gemini",
+    }
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", "0"))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send(self, status: int, content_type: str, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeGeminiHandler(_FakeHandler):
+    def do_POST(self):
+        request = self._read_json()
+        time.sleep(self.latency)
+        reply = gemini_reply(request)
+        path = urlparse(self.path).path
+        if path.endswith(":streamGenerateContent"):
+            self._send(200, "text/event-stream", f"data: {json.dumps(reply)}\r\n\r\n".encode("utf-8"))
+        elif path.endswith(":generateContent"):
+            self._send(200, "application/json", json.dumps(reply).encode("utf-8"))
+        else:
+            self._send(404, "application/json", b'{"error": "not found"}')
+
+
+class FakeElevenLabsHandler(_FakeHandler):
+    def do_POST(self):
+        request = self._read_json()
+        path = urlparse(self.path).path
+        if not path.startswith("/v1/text-to-speech/"):
+            self._send(404, "application/json", b'{"detail": "not found"}')
+            return
+        frames = max(1, len(request.get("text", "")) * MP3_FRAMES_PER_CHAR)
+        time.sleep(self.latency)
+        if path.endswith("/stream"):
+            # Chunked transfer, one chunk per ~second of audio
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/mpeg")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for start in range(0, frames, 38):
+                chunk = MP3_FRAME * min(38, frames - start)
+                self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self._send(200, "audio/mpeg", MP3_FRAME * frames)
+
+
+class FakeServer:
+    """Runs a fake API handler on 127.0.0.1 in a daemon thread."""
+
+    def __init__(self, handler_class, latency: float = 0.0, port: int = 0):
+        handler = type(handler_class.__name__, (handler_class,), {"latency": latency})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
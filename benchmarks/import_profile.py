@@ -0,0 +1,59 @@
+"""
+Import-time profile of the backend, to keep cold starts in check.
+
+Imports a module in a fresh interpreter with `python -X importtime` and reports
+the total import time plus the slowest modules by cumulative and self time.
+
+Usage:
+------
+    python benchmarks/import_profile.py                      # multi_tools_agent.agent
+    python benchmarks/import_profile.py --module app --top 30
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def profile_imports(module: str):
+    """Returns [(self_us, cumulative_us, depth, name)] for every module imported by `module`."""
+    env = dict(os.environ, PYTHONPATH=ROOT_DIR)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="multi_tools_agent.agent")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = profile_imports(args.module)
+    total_us = sum(cumulative for _, cumulative, depth, _ in rows if depth == 0)
+    print(f"import {args.module}: {total_us / 1000:.1f} ms total, {len(rows)} modules\n")
+
+    print(f"Top {args.top} by cumulative time:")
+    for _, cumulative, _, name in sorted(rows, key=lambda row: -row[1])[:args.top]:
+        print(f"  {cumulative / 1000:9.1f} ms  {name}")
+
+    print(f"\nTop {args.top} by self time:")
+    for self_us, _, _, name in sorted(rows, key=lambda row: -row[0])[:args.top]:
+        print(f"  {self_us / 1000:9.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
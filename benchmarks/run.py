@@ -0,0 +1,229 @@
+"""
+Offline benchmark for the support-info-agent backend.
+
+Starts the fake Gemini / ElevenLabs servers, serves the FastAPI app from app.py
+with uvicorn on a local port, drives it with N concurrent simulated sessions and
+reports p50/p95/p99 turn latency, throughput and RSS for the /run and /run_sse
+(time to first event and to the end of the stream) scenarios, followed by
+microbenchmarks of get_current_time and get_weather. No network access needed.
+
+Usage:
+------
+    python benchmarks/run.py --sessions 20 --turns 5 --model-latency 0.05
+    python benchmarks/run.py --scenario run_sse
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+import httpx
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_servers import FakeElevenLabsHandler, FakeGeminiHandler, FakeServer  # noqa: E402
+
+MESSAGES = [
+    "what is the weather in London",
+    "what time is it in Tokyo",
+    "what is the weather in New York and the time in New York",
+    "say out loud the forecasted weather in New York",
+    "hello there",
+]
+APP_NAME = "multi_tools_agent"
+SCENARIOS = ("run", "run_sse")
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process (the app runs in-process)."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except FileNotFoundError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def configure_environment(args, gemini_url: str, elevenlabs_url: str, work_dir: str) -> None:
+    # Must run before app.py / multi_tools_agent are imported: they read config at import time
+    os.environ.update({
+        "GOOGLE_API_KEY": "fake-key",
+        "GOOGLE_GENAI_USE_VERTEXAI": "0",
+        "GOOGLE_GEMINI_BASE_URL": gemini_url,
+        "ELEVENLABS_API_KEY": "fake-key",
+        "ELEVENLABS_BASE_URL": elevenlabs_url,
+        "AUDIO_CACHE_DIR": os.path.join(work_dir, "output"),
+        "TRANSLATION_CACHE_PATH": os.path.join(work_dir, "translation_cache.db"),
+    })
+    if args.session_store == "sqlite":
+        os.environ["SESSION_SERVICE_URI"] = f"sqlite:///{os.path.join(work_dir, 'sessions.db')}"
+    else:
+        os.environ["SESSION_SERVICE_URI"] = "memory://"
+
+
+def load_backend():
+    import app as backend
+
+    return backend.app
+
+
+def start_backend(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def run_turn_sse(client: httpx.AsyncClient, payload: dict, start: float, first_events: list) -> int:
+    # The stream ends with the turn; the first "data:" line is what a client renders first
+    async with client.stream("POST", "/run_sse", json={**payload, "streaming": False}) as response:
+        if response.status_code != 200:
+            return response.status_code
+        first_event_seen = False
+        async for line in response.aiter_lines():
+            if line.startswith("data:") and not first_event_seen:
+                first_events.append(time.perf_counter() - start)
+                first_event_seen = True
+        return response.status_code
+
+
+async def simulate_session(
+    client: httpx.AsyncClient, scenario: str, turns: int, latencies: list, first_events: list, errors: list
+) -> None:
+    user_id = f"bench-user-{uuid.uuid4()}"
+    session_id = f"bench-session-{uuid.uuid4()}"
+    response = await client.post(f"/apps/{APP_NAME}/users/{user_id}/sessions/{session_id}", json={})
+    if response.status_code != 200:
+        errors.append(response.status_code)
+        return
+    for turn in range(turns):
+        message = MESSAGES[turn % len(MESSAGES)]
+        payload = {
+            "app_name": APP_NAME,
+            "user_id": user_id,
+            "session_id": session_id,
+            "new_message": {"role": "user", "parts": [{"text": message}]},
+        }
+        start = time.perf_counter()
+        if scenario == "run_sse":
+            status_code = await run_turn_sse(client, payload, start, first_events)
+        else:
+            status_code = (await client.post("/run", json=payload)).status_code
+        if status_code == 200:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors.append(status_code)
+
+
+async def run_load(base_url: str, scenario: str, sessions: int, turns: int) -> dict:
+    latencies, first_events, errors = [], [], []
+    limits = httpx.Limits(max_connections=sessions, max_keepalive_connections=sessions)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            simulate_session(client, scenario, turns, latencies, first_events, errors) for _ in range(sessions)
+        ))
+        elapsed = time.perf_counter() - start
+    return {"latencies": latencies, "first_events": first_events, "errors": errors, "elapsed": elapsed}
+
+
+def report_load(scenario: str, args, result: dict) -> None:
+    latencies = result["latencies"]
+    print(f"\n/{scenario}: {len(latencies)} turns ok, {len(result['errors'])} failed "
+          f"({args.sessions} sessions x {args.turns} turns)")
+    if latencies:
+        print(f"Turn latency p50: {percentile(latencies, 50) * 1000:8.1f} ms")
+        print(f"Turn latency p95: {percentile(latencies, 95) * 1000:8.1f} ms")
+        print(f"Turn latency p99: {percentile(latencies, 99) * 1000:8.1f} ms")
+        print(f"Turn latency mean:{statistics.mean(latencies) * 1000:8.1f} ms")
+    first_events = result["first_events"]
+    if first_events:
+        print(f"First event p50:  {percentile(first_events, 50) * 1000:8.1f} ms")
+        print(f"First event p95:  {percentile(first_events, 95) * 1000:8.1f} ms")
+    print(f"Throughput:       {len(latencies) / result['elapsed']:8.1f} turns/s")
+
+
+def microbenchmark(func, iterations: int) -> float:
+    """Mean microseconds per call."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def run_microbenchmarks(iterations: int) -> None:
+    from multi_tools_agent import agent
+
+    cities = ["London", "Tokyo", "New York", "NYC", "São Paulo", "york"]
+    tool_context = SimpleNamespace(state={})
+    loop = asyncio.new_event_loop()
+    print("\nMicrobenchmarks (mean per call):")
+    for city in cities:
+        micros = microbenchmark(lambda: agent.get_current_time(city), iterations)
+        print(f"  {f'get_current_time({city!r})':32} {micros:8.2f} us")
+    for city in ["London", "New York", "Atlantis"]:
+        micros = microbenchmark(lambda: loop.run_until_complete(agent.get_weather(city, tool_context)), iterations)
+        print(f"  {f'get_weather({city!r})':32} {micros:8.2f} us")
+    loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent simulated sessions")
+    parser.add_argument("--turns", type=int, default=5, help="messages per session")
+    parser.add_argument("--model-latency", type=float, default=0.05, help="fake Gemini latency per call (s)")
+    parser.add_argument("--tts-latency", type=float, default=0.1, help="fake ElevenLabs latency per call (s)")
+    parser.add_argument("--session-store", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append",
+                        help="endpoint to load, repeatable (default: all)")
+    parser.add_argument("--port", type=int, default=9899)
+    parser.add_argument("--micro-iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with FakeServer(FakeGeminiHandler, args.model_latency) as gemini, \
+            FakeServer(FakeElevenLabsHandler, args.tts_latency) as elevenlabs, \
+            tempfile.TemporaryDirectory() as work_dir:
+        configure_environment(args, gemini.url, elevenlabs.url, work_dir)
+        os.chdir(work_dir)
+        app = load_backend()
+        # Baseline after the import, so the RSS delta is what serving the load costs
+        rss_before = rss_mb()
+        server, thread = start_backend(app, args.port)
+        for scenario in args.scenario or SCENARIOS:
+            result = asyncio.run(run_load(f"http://127.0.0.1:{args.port}", scenario, args.sessions, args.turns))
+            report_load(scenario, args, result)
+        rss_after = rss_mb()
+        print(f"\nRSS:              {rss_before:8.1f} MB after import, {rss_after:8.1f} MB after load")
+
+        run_microbenchmarks(args.micro_iterations)
+
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
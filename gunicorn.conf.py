@@ -0,0 +1,70 @@
+"""
+Production serving for app.py: `gunicorn app:app` (this file is picked up from the working directory).
+
+The app is imported once in the master and forked into WEB_CONCURRENCY uvicorn
+workers, so import costs and warm-up are paid once and shared copy-on-write.
+Sessions (SQLite), synthesized clips (AUDIO_CACHE_DIR), streamed-clip requests
+and translations (SQLite) live in local storage, so any worker can serve any
+session. Admission and rate limits, and the in-memory weather and turn caches,
+are per worker.
+"""
+import multiprocessing
+import os
+import shutil
+
+# Must be set before prometheus_client is imported by the preloaded app
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc")
+shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = os.getenv("PRELOAD_APP", "true").lower() == "true"
+
+# SSE runs and voice synthesis can take tens of seconds; on SIGTERM workers
+# stop accepting connections and get graceful_timeout seconds to finish them.
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+loglevel = os.getenv("LOG_LEVEL", "INFO").lower()
+accesslog = os.getenv("ACCESS_LOG") or None
+if os.getenv("LOG_FORMAT", "json").lower() == "json":
+    # gunicorn and uvicorn server logs in the same JSON lines as the app's
+    logconfig_dict = {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "formatters": {"json": {"()": "multi_tools_agent.tools.logging_config.JsonFormatter"}},
+        "handlers": {"console": {"class": "logging.StreamHandler", "formatter": "json", "stream": "ext://sys.stdout"}},
+        # The app routes the root logger itself (multi_tools_agent.tools.logging_config)
+        "root": {"level": loglevel.upper(), "handlers": []},
+        "loggers": {
+            "gunicorn.error": {"handlers": ["console"], "level": loglevel.upper(), "propagate": False},
+            "gunicorn.access": {"handlers": ["console"], "level": loglevel.upper(), "propagate": False},
+        },
+    }
+
+
+def on_starting(server):
+    if os.getenv("SESSION_STORE") == "memory" and workers > 1:
+        server.log.warning("SESSION_STORE=memory with several workers: sessions are not shared between workers.")
+
+
+def post_fork(server, worker):
+    # The log writer thread started at import does not survive the fork
+    from multi_tools_agent.tools.logging_config import configure_logging
+
+    configure_logging()
+
+
+def worker_exit(server, worker):
+    from multi_tools_agent.tools.logging_config import stop_logging
+
+    stop_logging()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
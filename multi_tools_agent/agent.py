@@ -1,45 +1,80 @@
+import asyncio
 import datetime
-import zoneinfo
-from zoneinfo import ZoneInfo
-from google.adk.agents import Agent
+import logging
 import os
-from dotenv import load_dotenv
-import requests
-from elevenlabs.client import ElevenLabs
-from elevenlabs.play import play
-from elevenlabs import save
-from google.adk.tools.tool_context import ToolContext
-from google.adk.tools import google_search
-from .prompt.prompt import agent_instruction
-from pathlib import Path
 import uuid
+from dotenv import load_dotenv
 
-# Load environment variables from .env file
+# Load environment variables from .env file before the tool modules read their settings
 load_dotenv()
 
+from google.adk.agents import Agent
+import httpx
+from google.adk.tools.tool_context import ToolContext
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+from .prompt.prompt import build_agent_instruction
+from .tools.timezones import get_zone, lookup_timezone
+from .tools.audio_cache import audio_cache, audio_cache_key
+from .tools.clients import get_elevenlabs_client
+from .tools.tts_stream import audio_url, stream_url, write_stream_request
+from .tools.tts_chunked import TTS_CHUNK_MIN_CHARS, TTS_CHUNKED, synthesize_chunked
+from .tools.voice_settings import read_voice_preferences, to_elevenlabs_voice_settings
+from .tools.http_client import post_with_retry
+from .tools.translation_cache import translation_cache, translation_cache_key
+from .tools.translation_batch import build_batch_request, parse_batch_response, plan_batches
+from .tools.weather import weather_cache
+from .tools.router import FAST_PATH_ROUTER, match_fast_path
+from .tools.turn_cache import turn_cache
+from .tools.context_window import context_window
+from .tools.executor import run_in_tool_pool
+from .tools.admission import UpstreamSaturated, upstream_limiter
+from .tools.metrics import (
+    FAST_PATH_TURNS,
+    TTS_BYTES,
+    after_model_callback,
+    before_model_callback,
+    cache_stats_collector,
+    instrument_tool,
+    model_error_callback,
+    track_upstream,
+)
+
+TRANSLATE_MODEL = os.getenv("TRANSLATE_MODEL", "gemini-2.0-flash")
+# Same variable google-genai honours, so the agent model and the translate tools can be
+# pointed at a local stand-in together
+GEMINI_API_BASE_URL = os.getenv("GOOGLE_GEMINI_BASE_URL", "https://generativelanguage.googleapis.com").rstrip("/")
+TTS_MODEL_ID = os.getenv("TTS_MODEL_ID", "eleven_multilingual_v2")
+TTS_OUTPUT_FORMAT = os.getenv("TTS_OUTPUT_FORMAT", "mp3_44100_128")
+# When enabled, get_voice_response only records the request and the audio is
+# synthesized while the client plays it from the /tts/stream endpoint.
+TTS_STREAMING = os.getenv("TTS_STREAMING", "false").lower() == "true"
+
+logger = logging.getLogger(__name__)
+
 from typing import Optional, List, Dict
 
-def get_weather(city: str, tool_context: ToolContext) -> dict:
+async def get_weather(city: str, tool_context: ToolContext) -> dict:
     """Retrieves weather, converts temp unit based on session state."""
-    print(f"--- Tool: get_weather_stateful called for {city} ---")
+    logger.debug("get_weather called for %s", city)
 
     # --- Read preference from state ---
     preferred_unit = tool_context.state.get("user_preference_temperature_unit", "Celsius") # Default to Celsius
-    print(f"--- Tool: Reading state 'user_preference_temperature_unit': {preferred_unit} ---")
+    logger.debug("Reading state 'user_preference_temperature_unit': %s", preferred_unit)
 
     city_normalized = city.lower().replace(" ", "")
 
-    # Mock weather data (always stored in Celsius internally)
-    mock_weather_db = {
-        "newyork": {"temp_c": 25, "condition": "sunny"},
-        "london": {"temp_c": 15, "condition": "cloudy"},
-        "tokyo": {"temp_c": 18, "condition": "light rain"},
-    }
+    try:
+        data = await weather_cache.get(city_normalized)
+        if data is not None:
+            temp_c = float(data["temp_c"])
+            condition = data["condition"]
+    except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+        # Includes a malformed body from the provider (bad JSON, missing fields)
+        logger.warning("Weather provider failed for '%s': %s", city, e)
+        return {"status": "error", "error_message": f"Sorry, weather information for '{city}' is unavailable right now."}
 
-    if city_normalized in mock_weather_db:
-        data = mock_weather_db[city_normalized]
-        temp_c = data["temp_c"]
-        condition = data["condition"]
+    if data is not None:
 
         # Format temperature based on state preference
         if preferred_unit == "Fahrenheit":
@@ -51,20 +86,51 @@ def get_weather(city: str, tool_context: ToolContext) -> dict:
 
         report = f"The weather in {city.capitalize()} is {condition} with a temperature of {temp_value:.0f}{temp_unit}."
         result = {"status": "success", "report": report}
-        print(f"--- Tool: Generated report in {preferred_unit}. Result: {result} ---")
+        logger.debug("Generated report in %s. Result: %s", preferred_unit, result)
 
         # Example of writing back to state (optional for this tool)
         tool_context.state["last_city_checked_stateful"] = city
-        print(f"--- Tool: Updated state 'last_city_checked_stateful': {city} ---")
+        logger.debug("Updated state 'last_city_checked_stateful': %s", city)
 
         return result
     else:
         # Handle city not found
         error_msg = f"Sorry, I don't have weather information for '{city}'."
-        print(f"--- Tool: City '{city}' not found. ---")
+        logger.debug("City '%s' not found", city)
         return {"status": "error", "error_message": error_msg}
 
 
+async def get_weather_for_cities(cities: List[str], tool_context: ToolContext) -> dict:
+    """Retrieves the weather of several cities in one call; prefer it over repeated get_weather calls.
+
+    Args:
+        cities (List[str]): The city names, e.g. ["London", "Tokyo", "New York"].
+
+    Returns:
+        dict: status and one get_weather result per city, in the requested order.
+    """
+    results = await asyncio.gather(*(get_weather(city, tool_context) for city in cities))
+    return {
+        "status": "success",
+        "results": [{"city": city, **result} for city, result in zip(cities, results)],
+    }
+
+
+def get_current_time_for_cities(cities: List[str]) -> dict:
+    """Get the current time in several cities in one call; prefer it over repeated get_current_time calls.
+
+    Args:
+        cities (List[str]): The city names or common aliases, e.g. ["London", "NYC"].
+
+    Returns:
+        dict: status and one get_current_time result per city, in the requested order.
+    """
+    return {
+        "status": "success",
+        "results": [{"city": city, **get_current_time(city)} for city in cities],
+    }
+
+
 def say_hello(name: Optional[str] = None) -> str: 
     """Provides a simple greeting. If a name is provided, it will be used.
 
@@ -76,25 +142,29 @@ def say_hello(name: Optional[str] = None) -> str:
     """
     if name:
         greeting = f"Hello, {name}!"
-        print(f"--- Tool: say_hello called with name: {name} ---")
+        logger.debug("say_hello called with name: %s", name)
     else:
         greeting = "Hello there!" # Default greeting if name is None or not explicitly passed
-        print(f"--- Tool: say_hello called without a specific name (name_arg_value: {name}) ---")
+        logger.debug("say_hello called without a specific name (name_arg_value: %s)", name)
     return greeting
 
 def say_goodbye() -> str:
     """Provides a simple farewell message to conclude the conversation."""
-    print(f"--- Tool: say_goodbye called ---")
+    logger.debug("say_goodbye called")
     return "Goodbye! Have a great day."
 
 def get_current_time(city: str) -> dict:
-    city_normalized = city.strip().replace(" ", "_").lower()
-    matching_zones = [
-        tz for tz in zoneinfo.available_timezones()
-        if city_normalized in tz.lower()
-    ]
+    """Get the current time in a city.
 
-    if not matching_zones:
+    Args:
+        city (str): The city name or a common alias (e.g. "NYC", "São Paulo").
+
+    Returns:
+        dict: status and a report with the local time and IANA timezone.
+    """
+    tz_identifier = lookup_timezone(city)
+
+    if not tz_identifier:
         return {
             "status": "error",
             "error_message": (
@@ -102,9 +172,7 @@ def get_current_time(city: str) -> dict:
             ),
         }
 
-    # Pick the best match (first one)
-    tz_identifier = matching_zones[0]
-    tz = ZoneInfo(tz_identifier)
+    tz = get_zone(tz_identifier)
     now = datetime.datetime.now(tz)
 
     report = (
@@ -136,70 +204,217 @@ def get_current_time(city: str) -> dict:
 #                 "error_message": f"Time information for '{city}' unavailable."
 #    }
 
-# ----- Example of a Function tool -----
-def get_current_date() -> dict:
-    """
-    Get the current date in the format YYYY-MM-DD
-    """
-    return {"current_date": datetime.now().strftime("%Y-%m-%d")}
-
-
-# ----- Example of a Built-in Tool -----
-search_agent = Agent(
-    model=os.getenv("AGENT_MODEL", "gemini-2.5-flash"),
-    name="search_agent",
-    instruction="""
-    You're a specialist in Google Search.
-    """,
-    tools=[google_search],
-)
-
-def translate_response(originalText: str, lang: str) -> dict:
+async def translate_response(originalText: str, lang: str) -> dict:
+    """Translates a text into one language; use translate_response_batch for several languages."""
+    cache_key = translation_cache_key(originalText, lang, TRANSLATE_MODEL)
+    cached_report = await translation_cache.get_async(cache_key)
+    if cached_report is not None:
+        return {"status": "success", "report": cached_report}
     try:
         api_key = os.getenv('GOOGLE_API_KEY')
-        base_url = 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent'
+        base_url = f'{GEMINI_API_BASE_URL}/v1beta/models/{TRANSLATE_MODEL}:generateContent'
         data = {"contents": [{
             "parts":[{"text": f"Convert the following text in {lang}: {originalText}"}]
             }]
         }
         headers = {'content-type': 'application/json'}
         params = { 'key': api_key }
-        api_response = requests.post(base_url, json=data, params=params, headers=headers );
-        return {"status": "success", "report": api_response.json()}
-    except e:
-        print(f"Error fetching translation data: {e}")
-        return None
+        await upstream_limiter.wait_async("gemini_translate")
+        with track_upstream("gemini_translate"):
+            api_response = await post_with_retry(base_url, json=data, params=params, headers=headers)
+            api_response.raise_for_status()
+        report = api_response.json()
+        await translation_cache.put_async(cache_key, report)
+        return {"status": "success", "report": report}
+    except (httpx.HTTPError, UpstreamSaturated) as e:
+        logger.warning("Error fetching translation data: %s", e)
+        return {"status": "error", "error_message": f"Translation to {lang} failed."}
+    
+async def translate_response_batch(originalText: str, langs: List[str], texts: Optional[List[str]] = None) -> dict:
+    """Translates one or more texts into several languages with a single model request.
+
+    Args:
+        originalText (str): The text to translate.
+        langs (List[str]): The target languages, e.g. ["French", "Japanese"].
+        texts (List[str], optional): Additional texts to translate into every target language.
+
+    Returns:
+        dict: status and one translation entry per (text, language) pair.
+    """
+    all_texts = ([originalText] if originalText else []) + list(texts or [])
+    items = [(text_index, lang) for text_index in range(len(all_texts)) for lang in langs]
+    batch_model = f"{TRANSLATE_MODEL}+json"
+
+    translations = {}
+    pending = []
+    for text_index, lang in items:
+        cached = await translation_cache.get_async(translation_cache_key(all_texts[text_index], lang, batch_model))
+        if cached is not None:
+            translations[(text_index, lang)] = cached["translation"]
+        else:
+            pending.append((text_index, lang))
+
+    async def run_batch(batch):
+        base_url = f'{GEMINI_API_BASE_URL}/v1beta/models/{TRANSLATE_MODEL}:generateContent'
+        await upstream_limiter.wait_async("gemini_translate")
+        with track_upstream("gemini_translate"):
+            api_response = await post_with_retry(
+                base_url,
+                json=build_batch_request(all_texts, batch),
+                params={'key': os.getenv('GOOGLE_API_KEY')},
+                headers={'content-type': 'application/json'},
+            )
+            api_response.raise_for_status()
+        return parse_batch_response(api_response.json(), batch)
+
+    # One failed batch only costs its own pairs; the others are still returned and cached
+    batches = plan_batches(all_texts, pending)
+    failed = False
+    for batch_result in await asyncio.gather(*(run_batch(batch) for batch in batches), return_exceptions=True):
+        if isinstance(batch_result, (httpx.HTTPError, UpstreamSaturated)):
+            logger.warning("Error fetching translation data: %s", batch_result)
+            failed = True
+            continue
+        if isinstance(batch_result, BaseException):
+            raise batch_result
+        for (text_index, lang), translation in batch_result.items():
+            translations[(text_index, lang)] = translation
+            await translation_cache.put_async(
+                translation_cache_key(all_texts[text_index], lang, batch_model),
+                {"translation": translation},
+            )
+    if failed and not translations:
+        return {"status": "error", "error_message": f"Translation to {', '.join(langs)} failed."}
+
+    entries = []
+    for text_index, lang in items:
+        if (text_index, lang) in translations:
+            entries.append({"text_index": text_index, "lang": lang, "translation": translations[(text_index, lang)]})
+        else:
+            entries.append({"text_index": text_index, "lang": lang, "error_message": f"Translation to {lang} unavailable."})
+    return {"status": "success", "translations": entries}
     
-def get_voice_response(text: str, voice_id: str = "JBFqnCBsd6RMkjVDRZzb"):
+def get_voice_response(text: str, tool_context: ToolContext):
+    """Generates a spoken audio version of some text.
+
+    The voice, voice settings and audio format are read from the session
+    state set by the client, not from the text.
+
+    Args:
+        text (str): The text to speak, in the language it should be spoken in.
+
+    Returns:
+        dict: the saved audio file path and the URL the backend serves it from.
+    """
     try:
-        print(f"Calling ElevenLabs Text2Speech service")
-        client = ElevenLabs(
-            api_key=os.getenv("ELEVENLABS_API_KEY"),
-        )
-        output_dir = Path("output")
-        output_dir.mkdir(exist_ok=True)
-        output_file_data = output_dir / f"{uuid.uuid4()}.mp3"
-
-        audio = client.text_to_speech.convert(
-            text=text,
-            voice_id=voice_id,
-            model_id="eleven_multilingual_v2",
-            output_format="mp3_44100_128",
-        )
-        save(audio, output_file_data)
-        print(f"saved at:`{output_file_data}`")
-        # Return the path of the saved audio file
-        return { "result": {"content":[{"text":f"saved at:{output_file_data}"}]} }
-    except APIError as e:
-        print(f"Error fetching translation data: {e}")
+        voice_id, output_format, voice_settings = read_voice_preferences(tool_context.state, TTS_OUTPUT_FORMAT)
+        cache_key = audio_cache_key(text, voice_id, TTS_MODEL_ID, output_format, voice_settings)
+        output_file_data = audio_cache.get(cache_key)
+        if output_file_data:
+            logger.debug("get_voice_response cache hit", extra={"clip_id": cache_key})
+            return { "result": {"content":[{"text":f"saved at:{output_file_data} audio at:{audio_url(cache_key)}"}]} }
+
+        if TTS_STREAMING:
+            write_stream_request(cache_key, text, voice_id, TTS_MODEL_ID, output_format, voice_settings)
+            output_file_data = audio_cache.path_for(cache_key)
+            logger.debug("get_voice_response streaming", extra={"clip_id": cache_key})
+            return { "result": {"content":[{"text":f"saved at:{output_file_data} stream at:{stream_url(cache_key)}"}]} }
+
+        output_file_data = audio_cache.path_for(cache_key)
+
+        if TTS_CHUNKED and len(text) >= TTS_CHUNK_MIN_CHARS:
+            logger.debug("Calling ElevenLabs Text2Speech service per sentence chunk", extra={"clip_id": cache_key})
+            synthesize_chunked(text, voice_id, TTS_MODEL_ID, output_format, voice_settings, output_file_data)
+            audio_cache.put(cache_key)
+            logger.debug("Saved voice response at %s", output_file_data, extra={"clip_id": cache_key})
+            return { "result": {"content":[{"text":f"saved at:{output_file_data} audio at:{audio_url(cache_key)}"}]} }
+
+        logger.debug("Calling ElevenLabs Text2Speech service", extra={"clip_id": cache_key})
+        client = get_elevenlabs_client()
+        upstream_limiter.wait("elevenlabs")
+        with track_upstream("elevenlabs"):
+            audio = client.text_to_speech.convert(
+                text=text,
+                voice_id=voice_id,
+                model_id=TTS_MODEL_ID,
+                output_format=output_format,
+                voice_settings=to_elevenlabs_voice_settings(voice_settings),
+            )
+            # Written aside and renamed, so other workers never pick up a partial clip
+            part_path = output_file_data.with_name(f"{output_file_data.name}.{uuid.uuid4().hex}.part")
+            try:
+                with open(part_path, "wb") as f:
+                    for chunk in audio:
+                        f.write(chunk)
+                os.replace(part_path, output_file_data)
+            finally:
+                part_path.unlink(missing_ok=True)
+        TTS_BYTES.inc(audio_cache.put(cache_key).stat().st_size)
+        logger.debug("Saved voice response at %s", output_file_data, extra={"clip_id": cache_key})
+        # Return the path of the saved audio file and the URL the backend serves it from
+        return { "result": {"content":[{"text":f"saved at:{output_file_data} audio at:{audio_url(cache_key)}"}]} }
+    except Exception as e:
+        logger.exception("Error generating voice response: %s", e)
         return {
             "status": "voice management failure",
         }
 
+async def fast_path_router(callback_context: CallbackContext) -> Optional[types.Content]:
+    """Answers simple "time in X" / "weather in X" messages without calling the model.
+
+    Runs as root_agent's before_agent_callback: returning content ends the turn
+    with a templated reply, returning None falls through to the LLM.
+    """
+    user_content = callback_context.user_content
+    if not FAST_PATH_ROUTER or not user_content or not user_content.parts:
+        return None
+    message = " ".join(part.text for part in user_content.parts if part.text)
+    route = match_fast_path(message)
+    if route is None:
+        return None
+
+    intent, city = route
+    if intent == "time":
+        result = get_current_time(city)
+    else:
+        result = await get_weather(city, callback_context)
+    if result.get("status") != "success":
+        return None
+
+    logger.debug("Fast-path router answered '%s' for %s without a model call", intent, city)
+    FAST_PATH_TURNS.labels(intent).inc()
+    return types.Content(role="model", parts=[types.Part(text=result["report"])])
+
+agent_tools = [
+    instrument_tool(tool)
+    for tool in (
+        get_weather,
+        get_weather_for_cities,
+        get_current_time,
+        get_current_time_for_cities,
+        translate_response,
+        translate_response_batch,
+        # Blocks on ElevenLabs for seconds; keep it off the event loop
+        run_in_tool_pool(get_voice_response),
+    )
+]
+
 root_agent = Agent(
     name = "support_info_agent",
     model=os.getenv("AGENT_MODEL","gemini-2.5-flash"),
-    description="Agent to answer questions about time, weather, translate text, provide voice responses, and fetch news from Reddit. It can also save information as a PDF.",
-    instruction=agent_instruction,
-    tools=[get_weather, get_current_time, translate_response, get_voice_response],
-)
\ No newline at end of file
+    description="Agent to answer questions about time and weather, translate text and provide voice responses.",
+    # Lists exactly the tools below, so the instruction never describes a tool the model cannot call
+    instruction=build_agent_instruction(agent_tools),
+    tools=agent_tools,
+    before_agent_callback=[fast_path_router, turn_cache.before_agent],
+    after_agent_callback=turn_cache.after_agent,
+    before_model_callback=[context_window.before_model, upstream_limiter.before_model, before_model_callback],
+    after_model_callback=[after_model_callback, context_window.after_model, turn_cache.after_model],
+    on_model_error_callback=model_error_callback,
+    after_tool_callback=turn_cache.after_tool,
+)
+
+cache_stats_collector.register("audio", audio_cache)
+cache_stats_collector.register("translation", translation_cache)
+cache_stats_collector.register("weather", weather_cache)
+cache_stats_collector.register("turn", turn_cache)
\ No newline at end of file
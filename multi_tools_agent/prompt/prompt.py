@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from typing import Callable, Iterable
+
 agent_instruction = """
 You are a skilled expert in providing general and/or support information for Users.
 
@@ -19,33 +21,26 @@ You are a skilled expert in providing general and/or support information for Use
 
 Your general process is as follows:
 
-1. **Understand the user's request.** Analyze the user's initial request to understand the goal - for example, "Can you please provide flights from Paris Charles de Gaulle to London City" If you do not understand the request, ask for more information.   
-2. **Identify the appropriate tools.** You will be provided with tools for a SQL-based IATA Airport database (csearch airport by iata, search iata for some airport name). You will also be able to web search via Google Search. Identify one **or more** appropriate tools to accomplish the user's request.  
-3. **Populate and validate the parameters.** Before calling the tools, do some reasoning to make sure that you are populating the tool parameters correctly. For example, Provide IATA values for origin and destination airports.   
-4. **Call the tools.** Once the parameters are validated, call the tool with the determined parameters.  
-5. **Analyze the tools' results, and provide insights back to the user.** Return the tools' result in a human-readable format. State which tools you called, if any. If your result is 2 or more bugs, always use a markdown table to report back. If there is any code, or timestamp, in the result, format the code with markdown backticks, or codeblocks.   
+1. **Understand the user's request.** Analyze the user's request to understand the goal - for example, "What time is it in Tokyo and what is the weather there?" If you do not understand the request, ask for more information.
+2. **Identify the appropriate tools.** Use one **or more** of the tools listed below. Prefer the tools that handle several cities or languages in one call over repeated single calls.
+3. **Populate and validate the parameters.** Before calling the tools, make sure you are populating the tool parameters correctly.
+4. **Call the tools.** Once the parameters are validated, call the tools with the determined parameters.
+5. **Analyze the tools' results, and provide insights back to the user.** Return the tools' result in a human-readable format. If there are 2 or more results, use a markdown table. Format code and timestamps with markdown backticks.
 6. **Ask the user if they need anything else.**
 
 **TOOLS:**
 
-1.  **get_current_date:**
-    This tool allows you to figure out the current date (today). If a user
-    asks something along the lines of "What tickets were opened in the last
-    week?" you can use today's date to figure out the past week.
-
-2.  **get_current_time:**
-    This tool allows you to figure out the current time (now) for some city
-
-3.  **get_weather:**
-    This tool allows you to get weather for some city
+"""
 
-4.  **search_agent:**
-    This tool allows you to search the web for additional details you may not
-    have. Only use this tool if other tools can not answer
-    the user query.
 
-5. ""get_voice_response:**
-    This tool allows you to generate a voice response for some text in a specified language.
-    Extract voice_id parameter value from the text request.
+def build_agent_instruction(tools: Iterable[Callable]) -> str:
+    """Appends one line per registered tool (name and docstring summary) to agent_instruction.
 
-"""
+    The full parameter docs already reach the model as function
+    declarations, so only the summary line is repeated here.
+    """
+    lines = []
+    for index, tool in enumerate(tools, start=1):
+        summary = (tool.__doc__ or "").strip().split("\n", 1)[0]
+        lines.append(f"{index}. **{tool.__name__}:** {summary}".rstrip())
+    return agent_instruction + "\n".join(lines) + "\n"
@@ -0,0 +1,348 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from .metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED
+
+# Inbound agent runs (POST /run, /run_sse)
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "32"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "2"))
+ADMISSION_PATHS = ("/run", "/run_sse")
+# Runs per second per user_id (client address when the body has none); 0 disables
+USER_RATE_PER_SEC = float(os.getenv("USER_RATE_PER_SEC", "1"))
+USER_RATE_BURST = int(os.getenv("USER_RATE_BURST", "5"))
+USER_RATE_MAX_TRACKED = int(os.getenv("USER_RATE_MAX_TRACKED", "10000"))
+# Inbound bodies larger than this are not parsed for a user_id
+_MAX_BODY_PEEK = 1024 * 1024
+
+# Outbound calls a process may start per second, per upstream (as named in
+# the agent_upstream_* metrics); unlisted upstreams are not limited. A call
+# waits for its token up to UPSTREAM_MAX_WAIT seconds, and fails fast beyond.
+UPSTREAM_MAX_WAIT = float(os.getenv("UPSTREAM_MAX_WAIT", "2"))
+# The upstream of the agent's own model calls; a run is only admitted once a
+# token for its first call is reserved.
+AGENT_UPSTREAM = "gemini_agent"
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_rates(spec: str) -> Dict[str, Tuple[float, int]]:
+    # "gemini_agent=10:20,elevenlabs=5:10" -> {upstream: (rate per second, burst)}
+    rates = {}
+    for item in spec.split(","):
+        name, sep, value = item.partition("=")
+        if sep:
+            rate, _, burst = value.partition(":")
+            rates[name.strip()] = (float(rate), int(burst or max(1, math.ceil(float(rate)))))
+    return rates
+
+
+UPSTREAM_RATE_LIMITS = _parse_rates(
+    os.getenv("UPSTREAM_RATE_LIMITS", "gemini_agent=10:20,gemini_translate=10:20,gemini_summary=2:4,elevenlabs=5:10")
+)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+
+
+class UpstreamSaturated(Exception):
+    """Raised instead of calling an upstream whose rate limit would make the caller wait too long."""
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"{upstream} rate limit reached, retry in {retry_after:.1f}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills rate tokens per second up to burst; thread-safe."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float = 0.0) -> Tuple[bool, float]:
+        """Takes a token if one is available within max_wait seconds.
+
+        Returns (True, seconds to wait before using it) or (False, seconds
+        until a token would be available), in which case nothing is taken.
+        """
+        if self.rate <= 0:
+            return True, 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+            if wait > max_wait:
+                return False, wait
+            # Tokens go negative for reservations made ahead of time
+            self._tokens -= 1
+            return True, wait
+
+    def refund(self) -> None:
+        """Gives back a token that was reserved but not used."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+
+class KeyedTokenBuckets:
+    """One TokenBucket per key (e.g. user ID), forgetting the least recently seen keys."""
+
+    def __init__(self, rate: float, burst: int, max_keys: int = USER_RATE_MAX_TRACKED):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str, max_wait: float = 0.0) -> Tuple[bool, float]:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+        return bucket.reserve(max_wait)
+
+
+class UpstreamReservation:
+    """A token taken ahead of a call, usable once the monotonic clock reaches ready_at."""
+
+    def __init__(self, upstream: str, ready_at: float):
+        self.upstream = upstream
+        self.ready_at = ready_at
+        self.used = False
+
+
+# The reservation made by AdmissionMiddleware for the current run
+_run_reservation: ContextVar[Optional[UpstreamReservation]] = ContextVar("upstream_run_reservation", default=None)
+
+
+class UpstreamLimiter:
+    """Paces outbound calls with one TokenBucket per upstream.
+
+    wait() is for calls made from worker threads (ElevenLabs SDK),
+    wait_async() for calls made on the event loop. Both raise
+    UpstreamSaturated rather than wait longer than UPSTREAM_MAX_WAIT.
+    reserve() takes a token ahead of time, so a run can be turned away
+    before it starts; refund() gives it back if the run never used it.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, int]] = UPSTREAM_RATE_LIMITS, max_wait: float = UPSTREAM_MAX_WAIT):
+        self.buckets = {upstream: TokenBucket(rate, burst) for upstream, (rate, burst) in limits.items()}
+        self.max_wait = max_wait
+
+    def _reserve(self, upstream: str) -> float:
+        bucket = self.buckets.get(upstream)
+        if bucket is None:
+            return 0.0
+        granted, wait = bucket.reserve(self.max_wait)
+        if not granted:
+            ADMISSION_REJECTED.labels("upstream").inc()
+            raise UpstreamSaturated(upstream, wait)
+        return wait
+
+    def wait(self, upstream: str) -> None:
+        delay = self._reserve(upstream)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, upstream: str) -> None:
+        delay = self._reserve(upstream)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def reserve(self, upstream: str) -> UpstreamReservation:
+        return UpstreamReservation(upstream, time.monotonic() + self._reserve(upstream))
+
+    def refund(self, reservation: UpstreamReservation) -> None:
+        bucket = self.buckets.get(reservation.upstream)
+        if bucket is not None and not reservation.used:
+            reservation.used = True
+            bucket.refund()
+
+    async def before_model(self, callback_context, llm_request) -> None:
+        # root_agent before_model_callback: paces the agent's own Gemini calls.
+        # The run's first call uses the token reserved when it was admitted.
+        reservation = _run_reservation.get()
+        if reservation is not None and not reservation.used and reservation.upstream == AGENT_UPSTREAM:
+            reservation.used = True
+            delay = reservation.ready_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return None
+        await self.wait_async(AGENT_UPSTREAM)
+        return None
+
+
+class AdmissionController:
+    """Caps concurrent agent runs, with a bounded wait queue in front of the cap.
+
+    A run that finds every slot taken waits up to queue_timeout seconds, unless
+    max_queue runs are already waiting; either way it is rejected with a 503
+    instead of piling up behind work the server cannot finish in time.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+    ):
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.waiting = 0
+
+    @asynccontextmanager
+    async def admit(self):
+        if self._slots.locked():
+            if self.waiting >= self.max_queue:
+                ADMISSION_REJECTED.labels("queue_full").inc()
+                raise AdmissionRejected(503, ADMISSION_RETRY_AFTER, "Server is at capacity, please retry later.")
+            self.waiting += 1
+            ADMISSION_QUEUE_DEPTH.inc()
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                ADMISSION_REJECTED.labels("queue_timeout").inc()
+                raise AdmissionRejected(503, ADMISSION_RETRY_AFTER, "Server is at capacity, please retry later.")
+            finally:
+                self.waiting -= 1
+                ADMISSION_QUEUE_DEPTH.dec()
+        else:
+            await self._slots.acquire()
+        ADMISSION_IN_FLIGHT.inc()
+        try:
+            yield
+        finally:
+            ADMISSION_IN_FLIGHT.dec()
+            self._slots.release()
+
+
+def _rejection_response(status_code: int, retry_after: float, detail: str) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail}, status_code=status_code, headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying the per-user rate limit and the in-flight cap to agent runs.
+
+    The slot is held until the response has been sent completely, so a
+    /run_sse stream counts as in flight for as long as it runs. A run is also
+    only started once a gemini_agent token is reserved for its first model
+    call; otherwise it gets a 503 with Retry-After before ADK has sent any
+    headers or stored the message, so the client can safely send it again.
+    Later model calls of an admitted run are paced by
+    UpstreamLimiter.before_model, and a saturation there fails the run like
+    any other model error.
+    """
+
+    def __init__(
+        self,
+        app,
+        user_buckets: Optional[KeyedTokenBuckets] = None,
+        controller: Optional[AdmissionController] = None,
+        limiter: Optional[UpstreamLimiter] = None,
+    ):
+        self.app = app
+        self.user_buckets = user_buckets or KeyedTokenBuckets(USER_RATE_PER_SEC, USER_RATE_BURST)
+        self.controller = controller or AdmissionController()
+        self.limiter = limiter or upstream_limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in ADMISSION_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        body, receive = await self._buffer_body(receive)
+        user_id = self._user_id(scope, body)
+        granted, retry_after = self.user_buckets.reserve(user_id)
+        if not granted:
+            ADMISSION_REJECTED.labels("user_rate").inc()
+            await _rejection_response(429, retry_after, "Too many requests, please slow down.")(scope, receive, send)
+            return
+
+        try:
+            async with self.controller.admit():
+                try:
+                    reservation = self.limiter.reserve(AGENT_UPSTREAM)
+                except UpstreamSaturated as e:
+                    logger.warning("Rejected run: %s", e)
+                    await _rejection_response(
+                        503, e.retry_after, "An upstream service is busy, please retry later."
+                    )(scope, receive, send)
+                    return
+                context_token = _run_reservation.set(reservation)
+                try:
+                    await self.app(scope, receive, send)
+                finally:
+                    _run_reservation.reset(context_token)
+                    # A run that failed before its first model call gives the token back
+                    self.limiter.refund(reservation)
+        except AdmissionRejected as e:
+            await _rejection_response(e.status_code, e.retry_after, e.reason)(scope, receive, send)
+
+    @staticmethod
+    async def _buffer_body(receive):
+        # Reads the request body so the user_id can be peeked at, then replays it downstream.
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return body, replay
+
+    @staticmethod
+    def _user_id(scope, body: bytes) -> str:
+        if len(body) <= _MAX_BODY_PEEK:
+            try:
+                user_id = json.loads(body).get("user_id")
+            except (ValueError, AttributeError):
+                user_id = None
+            if isinstance(user_id, str) and user_id:
+                return f"user:{user_id}"
+        client = scope.get("client")
+        return f"addr:{client[0] if client else 'unknown'}"
+
+
+upstream_limiter = UpstreamLimiter()
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", "output")
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+INDEX_FILE_NAME = "audio-cache-index.json"
+# Leftovers next to the clips are removed by age when the directory is
+# rescanned: stream requests (<key>.json) that were never played, and part,
+# lock and temporary files of syntheses whose worker died.
+AUDIO_CACHE_REQUEST_TTL = float(os.getenv("AUDIO_CACHE_REQUEST_TTL", str(24 * 3600)))
+AUDIO_CACHE_PART_TTL = float(os.getenv("AUDIO_CACHE_PART_TTL", "3600"))
+_PART_SUFFIXES = (".part", ".lock", ".tmp")
+# audio_cache_key digests; other MP3 files in the directory are left alone
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+logger = logging.getLogger(__name__)
+
+
+def audio_cache_key(
+    text: str,
+    voice_id: str,
+    model_id: str,
+    output_format: str,
+    voice_settings: Optional[dict] = None,
+) -> str:
+    """Content address of a synthesized clip: sha256 over every input that changes the audio."""
+    payload = json.dumps(
+        {
+            "text": text,
+            "voice_id": voice_id,
+            "model_id": model_id,
+            "output_format": output_format,
+            "voice_settings": voice_settings or {},
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _is_valid_index(stored) -> bool:
+    # A list of [key, size] or [key, size, last used] entries
+    return isinstance(stored, list) and all(
+        isinstance(item, list)
+        and len(item) in (2, 3)
+        and isinstance(item[0], str)
+        and _KEY_PATTERN.match(item[0])
+        and isinstance(item[1], int)
+        and all(isinstance(value, (int, float)) for value in item[2:])
+        for item in stored
+    )
+
+
+class AudioCache:
+    """Size-capped LRU cache of synthesized MP3 files, keyed by audio_cache_key.
+
+    The LRU order is kept in a JSON index next to the clips so the cache
+    survives restarts. Hits only reorder the in-memory index; the new order is
+    persisted with the next insertion. The clip files are the source of truth:
+    at startup and before every insertion the directory is rescanned, so
+    worker processes sharing it adopt clips written by the others and forget
+    clips another worker evicted. Every worker therefore enforces max_bytes on
+    the whole directory. Entries are ordered by when they were last used, an
+    adopted clip by when it was written, so a clip another worker has just
+    synthesized is not the first to go.
+    """
+
+    def __init__(self, cache_dir: str = AUDIO_CACHE_DIR, max_bytes: int = AUDIO_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.index_path = self.cache_dir / INDEX_FILE_NAME
+        # key -> (size in bytes, last used as a wall-clock time), least recently used first
+        self._entries: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._load_index_locked()
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.mp3"
+
+    def get(self, key: str) -> Optional[Path]:
+        """Returns the cached clip path, or None (and counts a miss)."""
+        with self._lock:
+            if key in self._entries and self.path_for(key).exists():
+                self._entries[key] = (self._entries[key][0], time.time())
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self.path_for(key)
+            if key in self._entries:
+                # File removed behind our back; forget it.
+                self._total_bytes -= self._entries.pop(key)[0]
+            else:
+                try:
+                    # Synthesized by another worker sharing the directory
+                    size = self.path_for(key).stat().st_size
+                except FileNotFoundError:
+                    size = None
+                if size is not None:
+                    self._entries[key] = (size, time.time())
+                    self._total_bytes += size
+                    self.hits += 1
+                    return self.path_for(key)
+            self.misses += 1
+            return None
+
+    def put(self, key: str) -> Path:
+        """Registers the clip already written at path_for(key) and evicts down to budget."""
+        path = self.path_for(key)
+        with self._lock:
+            size = path.stat().st_size
+            self._sync_with_dir_locked()
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[0]
+            self._entries[key] = (size, time.time())
+            self._total_bytes += size
+            self._evict_locked(keep=key)
+            self._save_index_locked()
+        return path
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _evict_locked(self, keep: str) -> None:
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            self._total_bytes -= self._entries.pop(oldest)[0]
+            self.evictions += 1
+            try:
+                self.path_for(oldest).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _load_index_locked(self) -> None:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            stored = []
+        if not _is_valid_index(stored):
+            # Rebuilt from the clips on disk, ordered by when they were written
+            logger.warning("Ignoring malformed audio cache index %s", self.index_path)
+            stored = []
+        for item in stored:
+            # [key, size] entries from older indexes are ordered by the sync below
+            self._entries[item[0]] = (item[1], item[2] if len(item) > 2 else 0.0)
+        self._sync_with_dir_locked()
+        self._evict_locked(keep="")
+
+    def _sync_with_dir_locked(self) -> None:
+        # Clips are only ever renamed into place, so every *.mp3 is complete
+        on_disk = {}
+        for path in self.cache_dir.glob("*.mp3"):
+            if not _KEY_PATTERN.match(path.stem):
+                continue
+            try:
+                on_disk[path.stem] = path.stat()
+            except FileNotFoundError:
+                continue
+        merged = []
+        for key, stat in on_disk.items():
+            last_used = self._entries[key][1] if key in self._entries else 0.0
+            merged.append((max(last_used, stat.st_mtime), key, stat.st_size))
+        merged.sort()
+        self._entries = OrderedDict((key, (size, last_used)) for last_used, key, size in merged)
+        self._total_bytes = sum(size for size, _ in self._entries.values())
+        self._remove_stale_files()
+
+    def _remove_stale_files(self) -> None:
+        now = time.time()
+        for path in self.cache_dir.iterdir():
+            if path.suffix == ".json" and _KEY_PATTERN.match(path.stem):
+                ttl = AUDIO_CACHE_REQUEST_TTL
+            elif path.suffix in _PART_SUFFIXES:
+                ttl = AUDIO_CACHE_PART_TTL
+            else:
+                continue
+            try:
+                if now - path.stat().st_mtime > ttl:
+                    path.unlink()
+            except FileNotFoundError:
+                continue
+
+    def _save_index_locked(self) -> None:
+        # Per-process temporary name: workers may save at the same time
+        tmp_path = self.index_path.with_name(f"{INDEX_FILE_NAME}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump([[key, size, last_used] for key, (size, last_used) in self._entries.items()], f)
+        os.replace(tmp_path, self.index_path)
+
+
+audio_cache = AudioCache()
@@ -0,0 +1,37 @@
+import os
+import threading
+
+# The ElevenLabs SDK takes ~150 ms to import, so it is only loaded when the
+# first voice response is synthesized (or by warm_up), never at agent import.
+_elevenlabs_client = None
+_elevenlabs_lock = threading.Lock()
+
+
+def get_elevenlabs_client():
+    """Returns the process-wide ElevenLabs client, importing the SDK on first use."""
+    global _elevenlabs_client
+    if _elevenlabs_client is None:
+        with _elevenlabs_lock:
+            if _elevenlabs_client is None:
+                from elevenlabs.client import ElevenLabs
+
+                _elevenlabs_client = ElevenLabs(
+                    api_key=os.getenv("ELEVENLABS_API_KEY"),
+                    base_url=os.getenv("ELEVENLABS_BASE_URL"),
+                )
+    return _elevenlabs_client
+
+
+def warm_up() -> None:
+    """Pays one-off initialization costs before the first request instead of during it.
+
+    Imports the ElevenLabs SDK and builds its client, creates the shared
+    HTTP client and loads the ZoneInfo objects of the most requested cities.
+    """
+    from .http_client import get_http_client
+    from .timezones import get_zone, lookup_timezone
+
+    get_elevenlabs_client()
+    get_http_client()
+    for city in ("New York", "London", "Tokyo", "Paris"):
+        get_zone(lookup_timezone(city))
@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import time
+from typing import List, Optional
+
+import httpx
+from google.genai import types
+
+from .admission import UpstreamSaturated, upstream_limiter
+from .http_client import post_with_retry
+from .metrics import CONTEXT_SUMMARIES, PROMPT_TOKENS, track_upstream
+from .translation_batch import estimate_tokens
+
+CONTEXT_WINDOW = os.getenv("CONTEXT_WINDOW", "true").lower() == "true"
+# Estimated tokens of conversation history sent with each model call
+CONTEXT_HISTORY_TOKEN_BUDGET = int(os.getenv("CONTEXT_HISTORY_TOKEN_BUDGET", "4000"))
+# Once the window has to slide, at least this many turns are folded into the
+# summary at a time, so it is rebuilt every few turns rather than every turn.
+CONTEXT_SUMMARY_EVERY = int(os.getenv("CONTEXT_SUMMARY_EVERY", "4"))
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "300"))
+# After a failed summary, turns leaving the window are dropped without one for this many seconds
+CONTEXT_SUMMARY_RETRY_AFTER = float(os.getenv("CONTEXT_SUMMARY_RETRY_AFTER", "60"))
+CONTEXT_SUMMARY_MODEL = os.getenv("CONTEXT_SUMMARY_MODEL", os.getenv("TRANSLATE_MODEL", "gemini-2.0-flash"))
+GEMINI_API_BASE_URL = os.getenv("GOOGLE_GEMINI_BASE_URL", "https://generativelanguage.googleapis.com").rstrip("/")
+
+# Session state holding the running summary and the timestamp of the first
+# user turn it does not cover. A timestamp, unlike a turn count, stays right
+# when session compaction deletes old events; the turn count is the fallback
+# when the request's turns cannot be matched to session events.
+CONTEXT_SUMMARY_STATE_KEY = "context_summary"
+CONTEXT_SUMMARY_UNTIL_STATE_KEY = "context_summary_until"
+CONTEXT_SUMMARY_TURNS_STATE_KEY = "context_summary_turns"
+CONTEXT_SUMMARY_RETRY_AT_STATE_KEY = "context_summary_retry_at"
+
+# Tool results can be long (translations, weather for many cities); the summary only needs their gist
+_TRANSCRIPT_PART_CHARS = 500
+
+logger = logging.getLogger(__name__)
+
+
+def _is_user_turn(content: types.Content) -> bool:
+    # A turn starts at a user text message; function responses also have the user role.
+    parts = content.parts or []
+    return content.role == "user" and any(part.text for part in parts) and not any(
+        part.function_response for part in parts
+    )
+
+
+def _render_part(role: str, part: types.Part) -> Optional[str]:
+    if part.text and not part.thought:
+        return f"{'User' if role == 'user' else 'Assistant'}: {part.text}"
+    if part.function_call:
+        return f"Assistant called {part.function_call.name}({json.dumps(part.function_call.args, default=str)})"
+    if part.function_response:
+        return f"{part.function_response.name} returned {json.dumps(part.function_response.response, default=str)}"
+    return None
+
+
+def render_transcript(contents: List[types.Content]) -> str:
+    lines = []
+    for content in contents:
+        for part in content.parts or []:
+            line = _render_part(content.role, part)
+            if line:
+                lines.append(line[:_TRANSCRIPT_PART_CHARS])
+    return "\n".join(lines)
+
+
+def estimate_content_tokens(content: types.Content) -> int:
+    # Counted in full: a long tool result costs its whole length in the prompt
+    return sum(estimate_tokens(_render_part(content.role, part) or "") for part in content.parts or [])
+
+
+def _user_turn_timestamps(session, turn_count: int) -> Optional[List[float]]:
+    # The user events behind the turn boundaries of the request contents, when they line up
+    timestamps = [
+        event.timestamp
+        for event in session.events
+        if event.author == "user" and event.content and _is_user_turn(event.content)
+    ]
+    return timestamps if len(timestamps) == turn_count else None
+
+
+class ContextWindow:
+    """Keeps the history sent to the agent model under a token budget, wired in as root_agent callbacks.
+
+    before_model slides the history window forward one whole user turn at a
+    time until the remaining turns fit CONTEXT_HISTORY_TOKEN_BUDGET. Turns that
+    fall out of the window are folded into a running summary, kept in session
+    state and appended to the system instruction. The summary is only rebuilt
+    when the window passes the turns it covers; if summarizing fails, those
+    turns are dropped without one, and no new summary is attempted for
+    CONTEXT_SUMMARY_RETRY_AFTER seconds. after_model reports the prompt token count
+    Gemini charged for each call.
+    """
+
+    def __init__(self, token_budget: int = CONTEXT_HISTORY_TOKEN_BUDGET, enabled: bool = CONTEXT_WINDOW):
+        self.enabled = enabled
+        self.token_budget = token_budget
+
+    async def before_model(self, callback_context, llm_request) -> None:
+        contents = llm_request.contents
+        boundaries = [index for index, content in enumerate(contents) if _is_user_turn(content)]
+        if not self.enabled or len(boundaries) < 2:
+            return None
+        state = callback_context.state
+        summary = state.get(CONTEXT_SUMMARY_STATE_KEY)
+        # The current turn always stays in the window
+        last_turn = len(boundaries) - 1
+        timestamps = _user_turn_timestamps(callback_context.session, len(boundaries))
+        summarized_until = state.get(CONTEXT_SUMMARY_UNTIL_STATE_KEY)
+        if timestamps is not None and summarized_until is not None:
+            summarized = sum(1 for timestamp in timestamps if timestamp < summarized_until)
+        else:
+            summarized = state.get(CONTEXT_SUMMARY_TURNS_STATE_KEY, 0)
+        summarized = min(summarized, last_turn)
+
+        tokens = [estimate_content_tokens(content) for content in contents]
+        dropped = summarized
+        while dropped < last_turn and sum(tokens[boundaries[dropped]:]) > self.token_budget:
+            dropped += 1
+
+        if dropped > summarized and time.time() >= state.get(CONTEXT_SUMMARY_RETRY_AT_STATE_KEY, 0):
+            dropped = min(max(dropped, summarized + CONTEXT_SUMMARY_EVERY), last_turn)
+            new_summary = await self._summarize(summary, contents[boundaries[summarized]:boundaries[dropped]])
+            if new_summary is not None:
+                summary = new_summary
+                state[CONTEXT_SUMMARY_STATE_KEY] = summary
+                state[CONTEXT_SUMMARY_TURNS_STATE_KEY] = dropped
+                if timestamps is not None:
+                    state[CONTEXT_SUMMARY_UNTIL_STATE_KEY] = timestamps[dropped]
+                logger.info("Folded turns %d-%d into the conversation summary", summarized + 1, dropped)
+            else:
+                state[CONTEXT_SUMMARY_RETRY_AT_STATE_KEY] = time.time() + CONTEXT_SUMMARY_RETRY_AFTER
+
+        if dropped:
+            llm_request.contents = contents[boundaries[dropped]:]
+        if summary:
+            llm_request.append_instructions([f"**SUMMARY OF THE EARLIER CONVERSATION:**\n{summary}"])
+        return None
+
+    async def _summarize(self, summary: Optional[str], contents: List[types.Content]) -> Optional[str]:
+        prompt = (
+            "Summarize this conversation between a user and a support assistant so the assistant can continue it. "
+            "Keep names, cities, languages, stated preferences and unanswered requests; leave out tool details. "
+            f"Use at most {CONTEXT_SUMMARY_MAX_TOKENS * 3 // 4} words.\n\n"
+        )
+        if summary:
+            prompt += f"Summary so far:\n{summary}\n\n"
+        prompt += f"Conversation:\n{render_transcript(contents)}"
+        try:
+            await upstream_limiter.wait_async("gemini_summary")
+            with track_upstream("gemini_summary"):
+                api_response = await post_with_retry(
+                    f"{GEMINI_API_BASE_URL}/v1beta/models/{CONTEXT_SUMMARY_MODEL}:generateContent",
+                    json={
+                        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+                        "generationConfig": {"maxOutputTokens": CONTEXT_SUMMARY_MAX_TOKENS},
+                    },
+                    params={"key": os.getenv("GOOGLE_API_KEY")},
+                    headers={"content-type": "application/json"},
+                )
+                api_response.raise_for_status()
+            new_summary = api_response.json()["candidates"][0]["content"]["parts"][0]["text"].strip()
+        except (httpx.HTTPError, UpstreamSaturated, KeyError, IndexError, ValueError) as e:
+            logger.warning("Summarizing the conversation failed: %s", e)
+            return None
+        CONTEXT_SUMMARIES.inc()
+        return new_summary
+
+    def after_model(self, callback_context, llm_response) -> None:
+        usage = llm_response.usage_metadata
+        if llm_response.partial or usage is None or not usage.prompt_token_count:
+            return None
+        PROMPT_TOKENS.observe(usage.prompt_token_count)
+        logger.debug(
+            "Model call used %d prompt tokens",
+            usage.prompt_token_count,
+            extra={"invocation_id": callback_context.invocation_id, "prompt_tokens": usage.prompt_token_count},
+        )
+        return None
+
+
+context_window = ContextWindow()
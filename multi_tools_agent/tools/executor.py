@@ -0,0 +1,55 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from .metrics import TOOL_QUEUE_DEPTH
+
+TOOL_THREAD_POOL_SIZE = int(os.getenv("TOOL_THREAD_POOL_SIZE", "16"))
+TOOL_DEFAULT_CONCURRENCY = int(os.getenv("TOOL_DEFAULT_CONCURRENCY", str(TOOL_THREAD_POOL_SIZE)))
+
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    # "get_voice_response=4,translate_response=8"
+    limits = {}
+    for item in spec.split(","):
+        name, sep, value = item.partition("=")
+        if sep:
+            limits[name.strip()] = int(value)
+    return limits
+
+
+TOOL_CONCURRENCY_LIMITS = _parse_limits(os.getenv("TOOL_CONCURRENCY_LIMITS", "get_voice_response=4"))
+
+tool_executor = ThreadPoolExecutor(max_workers=TOOL_THREAD_POOL_SIZE, thread_name_prefix="tool")
+
+
+def run_in_tool_pool(func: Callable) -> Callable:
+    """Turns a blocking sync tool into a coroutine that runs on the shared tool thread pool.
+
+    At most TOOL_CONCURRENCY_LIMITS[tool] calls run at once; the others wait
+    on the event loop (without holding a thread) and are counted in the
+    agent_tool_queue_depth gauge. The event loop keeps serving other sessions
+    while the tool blocks on network I/O.
+    """
+    tool = func.__name__
+    limit = TOOL_CONCURRENCY_LIMITS.get(tool, TOOL_DEFAULT_CONCURRENCY)
+    semaphore = asyncio.Semaphore(limit)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        TOOL_QUEUE_DEPTH.labels(tool).inc()
+        try:
+            await semaphore.acquire()
+        finally:
+            TOOL_QUEUE_DEPTH.labels(tool).dec()
+        try:
+            context = contextvars.copy_context()
+            call = functools.partial(context.run, func, *args, **kwargs)
+            return await asyncio.get_running_loop().run_in_executor(tool_executor, call)
+        finally:
+            semaphore.release()
+
+    return wrapper
@@ -0,0 +1,194 @@
+import asyncio
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+
+# Gauges are summed over live worker processes when PROMETHEUS_MULTIPROC_DIR is set (gunicorn)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+TOOL_LATENCY = Histogram(
+    "agent_tool_latency_seconds", "Tool call latency", ["tool"], buckets=LATENCY_BUCKETS
+)
+TOOL_ERRORS = Counter(
+    "agent_tool_errors_total", "Tool calls that raised or returned an error status", ["tool"]
+)
+TOOL_IN_FLIGHT = Gauge("agent_tool_in_flight", "Tool calls currently running", ["tool"], multiprocess_mode="livesum")
+TOOL_QUEUE_DEPTH = Gauge(
+    "agent_tool_queue_depth",
+    "Tool calls waiting for a slot in the tool thread pool",
+    ["tool"],
+    multiprocess_mode="livesum",
+)
+
+UPSTREAM_LATENCY = Histogram(
+    "agent_upstream_latency_seconds", "Outbound API call latency", ["upstream"], buckets=LATENCY_BUCKETS
+)
+UPSTREAM_ERRORS = Counter("agent_upstream_errors_total", "Outbound API calls that failed", ["upstream"])
+UPSTREAM_IN_FLIGHT = Gauge(
+    "agent_upstream_in_flight", "Outbound API calls currently running", ["upstream"], multiprocess_mode="livesum"
+)
+
+TTS_BYTES = Counter("agent_tts_bytes_synthesized_total", "MP3 bytes received from ElevenLabs")
+FAST_PATH_TURNS = Counter(
+    "agent_fast_path_turns_total", "Turns answered by the fast-path router without a model call", ["intent"]
+)
+PROMPT_TOKENS = Histogram(
+    "agent_prompt_tokens",
+    "Prompt tokens per agent model call, as reported by Gemini",
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+)
+ADMISSION_IN_FLIGHT = Gauge("agent_admission_in_flight", "Agent runs currently admitted", multiprocess_mode="livesum")
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "agent_admission_queue_depth", "Agent runs waiting for an admission slot", multiprocess_mode="livesum"
+)
+ADMISSION_REJECTED = Counter(
+    "agent_admission_rejected_total",
+    "Agent runs or upstream calls refused by admission control or rate limits",
+    ["reason"],
+)
+CONTEXT_SUMMARIES = Counter(
+    "agent_context_summaries_total", "Times older conversation turns were folded into the session summary"
+)
+
+
+def _is_error_result(result) -> bool:
+    return isinstance(result, dict) and result.get("status") not in (None, "success")
+
+
+def instrument_tool(func: Callable) -> Callable:
+    """Wraps a tool with latency, error and in-flight metrics, keeping its signature for ADK."""
+    tool = func.__name__
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            TOOL_IN_FLIGHT.labels(tool).inc()
+            start = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception:
+                TOOL_ERRORS.labels(tool).inc()
+                raise
+            finally:
+                TOOL_LATENCY.labels(tool).observe(time.perf_counter() - start)
+                TOOL_IN_FLIGHT.labels(tool).dec()
+            if _is_error_result(result):
+                TOOL_ERRORS.labels(tool).inc()
+            return result
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        TOOL_IN_FLIGHT.labels(tool).inc()
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            TOOL_ERRORS.labels(tool).inc()
+            raise
+        finally:
+            TOOL_LATENCY.labels(tool).observe(time.perf_counter() - start)
+            TOOL_IN_FLIGHT.labels(tool).dec()
+        if _is_error_result(result):
+            TOOL_ERRORS.labels(tool).inc()
+        return result
+
+    return wrapper
+
+
+@contextmanager
+def track_upstream(upstream: str):
+    """Times an outbound call (works around awaits too) and counts it as failed if it raises."""
+    UPSTREAM_IN_FLIGHT.labels(upstream).inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        UPSTREAM_ERRORS.labels(upstream).inc()
+        raise
+    finally:
+        UPSTREAM_LATENCY.labels(upstream).observe(time.perf_counter() - start)
+        UPSTREAM_IN_FLIGHT.labels(upstream).dec()
+
+
+# Agent model-call timing, keyed by invocation ID between the before/after callbacks.
+_model_call_starts: Dict[str, float] = {}
+
+
+def _finish_model_call(invocation_id: str, failed: bool = False) -> None:
+    start = _model_call_starts.pop(invocation_id, None)
+    if start is None:
+        return
+    UPSTREAM_LATENCY.labels("gemini_agent").observe(time.perf_counter() - start)
+    UPSTREAM_IN_FLIGHT.labels("gemini_agent").dec()
+    if failed:
+        UPSTREAM_ERRORS.labels("gemini_agent").inc()
+
+
+def _abandon_model_call(invocation_id: str) -> None:
+    # The run's task ended (e.g. cancelled on client disconnect) while the call was open
+    if _model_call_starts.pop(invocation_id, None) is not None:
+        UPSTREAM_IN_FLIGHT.labels("gemini_agent").dec()
+
+
+def before_model_callback(callback_context, llm_request):
+    invocation_id = callback_context.invocation_id
+    _model_call_starts[invocation_id] = time.perf_counter()
+    UPSTREAM_IN_FLIGHT.labels("gemini_agent").inc()
+    try:
+        asyncio.current_task().add_done_callback(lambda _task: _abandon_model_call(invocation_id))
+    except (RuntimeError, AttributeError):
+        pass
+    return None
+
+
+def after_model_callback(callback_context, llm_response):
+    # In SSE mode this also runs for every partial chunk; the call ends with the final response
+    if llm_response.partial:
+        return None
+    _finish_model_call(callback_context.invocation_id, failed=bool(getattr(llm_response, "error_code", None)))
+    return None
+
+
+def model_error_callback(callback_context, llm_request, error):
+    # Runs instead of after_model_callback when the model call raises
+    _finish_model_call(callback_context.invocation_id, failed=True)
+    return None
+
+
+class CacheStatsCollector:
+    """Exposes the stats() of every registered cache as labelled gauges at scrape time.
+
+    Cache stats live in process memory, so with several workers they describe
+    the worker that answers the scrape.
+    """
+
+    def __init__(self):
+        self.caches: Dict[str, object] = {}
+
+    def register(self, name: str, cache) -> None:
+        self.caches[name] = cache
+
+    def collect(self):
+        hits = GaugeMetricFamily("agent_cache_hits", "Cache hits since start", labels=["cache"])
+        misses = GaugeMetricFamily("agent_cache_misses", "Cache misses since start", labels=["cache"])
+        ratio = GaugeMetricFamily("agent_cache_hit_ratio", "Cache hit ratio since start", labels=["cache"])
+        for name, cache in self.caches.items():
+            stats = cache.stats()
+            hit_count = stats.get("hits", stats.get("memory_hits", 0) + stats.get("disk_hits", 0))
+            hits.add_metric([name], hit_count)
+            misses.add_metric([name], stats.get("misses", 0))
+            ratio.add_metric([name], stats.get("hit_ratio", 0.0))
+        yield hits
+        yield misses
+        yield ratio
+
+
+cache_stats_collector = CacheStatsCollector()
+REGISTRY.register(cache_stats_collector)
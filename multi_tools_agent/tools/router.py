@@ -0,0 +1,45 @@
+import os
+import re
+from typing import Optional, Tuple
+
+from .timezones import TIMEZONE_INDEX, normalize_city
+
+FAST_PATH_ROUTER = os.getenv("FAST_PATH_ROUTER", "true").lower() == "true"
+
+_CITY = r"(?P<city>[^\W\d_][\w .'-]*?)"
+_END = r"\s*[?.!]*\s*$"
+_CONJUNCTION = re.compile(r"\b(?:and|or|then|also|plus)\b|[,;&]", re.IGNORECASE)
+
+# Only whole-message matches are routed; anything with extra clauses
+# ("...and say it out loud", "...in French") goes to the model.
+INTENT_PATTERNS = (
+    ("time", re.compile(
+        r"^\s*(?:(?:what|what's|whats)\s+(?:is\s+)?)?(?:the\s+)?(?:current\s+|local\s+)?time\s+"
+        r"(?:is\s+it\s+|now\s+)?in\s+" + _CITY + _END,
+        re.IGNORECASE,
+    )),
+    ("weather", re.compile(
+        r"^\s*(?:(?:what|what's|whats|how)\s+(?:is\s+)?)?(?:the\s+)?(?:current\s+)?weather\s+"
+        r"(?:like\s+)?(?:today\s+)?in\s+" + _CITY + r"(?:\s+today)?" + _END,
+        re.IGNORECASE,
+    )),
+)
+
+
+def match_fast_path(text: str) -> Optional[Tuple[str, str]]:
+    """Returns (intent, city) when the message is a simple time/weather question, else None.
+
+    Time questions are only routed when the city is an exact entry of the
+    timezone index, so ambiguous names still get the model's judgement.
+    """
+    for intent, pattern in INTENT_PATTERNS:
+        match = pattern.match(text)
+        if not match:
+            continue
+        city = match.group("city").strip()
+        if _CONJUNCTION.search(city):
+            return None
+        if intent == "time" and normalize_city(city) not in TIMEZONE_INDEX:
+            return None
+        return intent, city
+    return None
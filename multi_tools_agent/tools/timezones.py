@@ -0,0 +1,177 @@
+import difflib
+import os
+import unicodedata
+import zoneinfo
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+# Continental areas holding the canonical IANA zones; used to prefer e.g.
+# "America/New_York" over the legacy "US/Eastern" link for the same city.
+CANONICAL_AREAS = (
+    "Africa", "America", "Antarctica", "Arctic", "Asia", "Atlantic",
+    "Australia", "Europe", "Indian", "Pacific",
+)
+
+# Common city names, nicknames and abbreviations that are not the last
+# component of an IANA zone identifier.
+CITY_ALIASES: Dict[str, str] = {
+    "nyc": "America/New_York",
+    "new york city": "America/New_York",
+    "manhattan": "America/New_York",
+    "brooklyn": "America/New_York",
+    "washington": "America/New_York",
+    "washington dc": "America/New_York",
+    "boston": "America/New_York",
+    "miami": "America/New_York",
+    "atlanta": "America/New_York",
+    "philadelphia": "America/New_York",
+    "dallas": "America/Chicago",
+    "houston": "America/Chicago",
+    "austin": "America/Chicago",
+    "san francisco": "America/Los_Angeles",
+    "sf": "America/Los_Angeles",
+    "la": "America/Los_Angeles",
+    "seattle": "America/Los_Angeles",
+    "las vegas": "America/Los_Angeles",
+    "san diego": "America/Los_Angeles",
+    "montreal": "America/Toronto",
+    "ottawa": "America/Toronto",
+    "rio": "America/Sao_Paulo",
+    "rio de janeiro": "America/Sao_Paulo",
+    "sao paulo": "America/Sao_Paulo",
+    "sp": "America/Sao_Paulo",
+    "cdmx": "America/Mexico_City",
+    "beijing": "Asia/Shanghai",
+    "peking": "Asia/Shanghai",
+    "shenzhen": "Asia/Shanghai",
+    "guangzhou": "Asia/Shanghai",
+    "hong kong": "Asia/Hong_Kong",
+    "mumbai": "Asia/Kolkata",
+    "bombay": "Asia/Kolkata",
+    "delhi": "Asia/Kolkata",
+    "new delhi": "Asia/Kolkata",
+    "bangalore": "Asia/Kolkata",
+    "bengaluru": "Asia/Kolkata",
+    "chennai": "Asia/Kolkata",
+    "saigon": "Asia/Ho_Chi_Minh",
+    "osaka": "Asia/Tokyo",
+    "kyoto": "Asia/Tokyo",
+    "abu dhabi": "Asia/Dubai",
+    "tel aviv": "Asia/Jerusalem",
+    "munich": "Europe/Berlin",
+    "frankfurt": "Europe/Berlin",
+    "hamburg": "Europe/Berlin",
+    "milan": "Europe/Rome",
+    "barcelona": "Europe/Madrid",
+    "geneva": "Europe/Zurich",
+    "edinburgh": "Europe/London",
+    "manchester": "Europe/London",
+    "st petersburg": "Europe/Moscow",
+    "saint petersburg": "Europe/Moscow",
+    "kiev": "Europe/Kyiv",
+    "canberra": "Australia/Sydney",
+    "wellington": "Pacific/Auckland",
+    "cape town": "Africa/Johannesburg",
+}
+
+ZONE_CACHE_SIZE = int(os.getenv("TIMEZONE_CACHE_SIZE", "128"))
+# A misspelt or partial city name is only resolved when the query has at
+# least FUZZY_MIN_QUERY_CHARS characters, its best match scores at least
+# FUZZY_MIN_SCORE and no other zone scores within FUZZY_MIN_MARGIN of it.
+FUZZY_MIN_QUERY_CHARS = 4
+FUZZY_MIN_SCORE = 0.8
+FUZZY_MIN_MARGIN = 0.05
+
+
+def normalize_city(city: str) -> str:
+    """Lower-cases a city name, strips accents and collapses separators."""
+    decomposed = unicodedata.normalize("NFKD", city)
+    ascii_only = "".join(c for c in decomposed if not unicodedata.combining(c))
+    cleaned = ascii_only.lower().replace("_", " ").replace("-", " ").replace(".", "")
+    return " ".join(cleaned.split())
+
+
+def _zone_rank(tz: str) -> Tuple[int, int]:
+    # Lower is better: canonical areas first, then shorter identifiers.
+    return (0 if tz.split("/")[0] in CANONICAL_AREAS else 1, len(tz))
+
+
+def build_timezone_index() -> Dict[str, str]:
+    """Builds the normalized city/alias -> IANA zone identifier index.
+
+    Walks the tzdata tree once; every later lookup is a dict access.
+    """
+    index: Dict[str, str] = {}
+    for tz in sorted(zoneinfo.available_timezones(), key=_zone_rank):
+        keys = {normalize_city(tz), normalize_city(tz.split("/")[-1])}
+        for key in keys:
+            # Sorted by rank, so the first zone seen for a key wins.
+            index.setdefault(key, tz)
+    for alias, tz in CITY_ALIASES.items():
+        index[normalize_city(alias)] = tz
+    return index
+
+
+TIMEZONE_INDEX: Dict[str, str] = build_timezone_index()
+# Legacy links outside the continental areas ("Poland", "GB", "US/Eastern")
+# are only matched exactly, never as a close spelling of something else.
+FUZZY_INDEX: Dict[str, str] = {
+    key: tz for key, tz in TIMEZONE_INDEX.items() if tz.split("/")[0] in CANONICAL_AREAS
+}
+
+
+@lru_cache(maxsize=ZONE_CACHE_SIZE)
+def get_zone(tz_identifier: str) -> ZoneInfo:
+    """Returns a cached ZoneInfo, so repeated lookups skip the tzdata file."""
+    return ZoneInfo(tz_identifier)
+
+
+@lru_cache(maxsize=1024)
+def rank_timezones(city: str, limit: int = 5) -> List[Tuple[str, float]]:
+    """Scores candidate zones for a city name that has no exact index entry.
+
+    A partial name scores the share of the zone's city name it covers, so
+    "kolkat" matches "kolkata" but "york" does not match "new york"; a
+    misspelling scores its difflib similarity to a name with as many words.
+    Returns (zone, score) pairs at or above FUZZY_MIN_SCORE, best first.
+    """
+    query = normalize_city(city)
+    if len(query) < FUZZY_MIN_QUERY_CHARS:
+        return []
+    word_count = len(query.split())
+    # Compares against query as seq2, which SequenceMatcher preprocesses once
+    matcher = difflib.SequenceMatcher()
+    matcher.set_seq2(query)
+    scored: Dict[str, float] = {}
+    for key, tz in FUZZY_INDEX.items():
+        words = key.split()
+        if query in words or key.startswith(query) or any(w.startswith(query) for w in words):
+            score = len(query) / len(key)
+        elif len(words) == word_count:
+            matcher.set_seq1(key)
+            if matcher.real_quick_ratio() < FUZZY_MIN_SCORE or matcher.quick_ratio() < FUZZY_MIN_SCORE:
+                continue
+            score = matcher.ratio()
+        else:
+            continue
+        if score >= FUZZY_MIN_SCORE and score > scored.get(tz, 0.0):
+            scored[tz] = score
+    ranked = sorted(scored, key=lambda tz: (-scored[tz], _zone_rank(tz)))
+    return [(tz, scored[tz]) for tz in ranked[:limit]]
+
+
+def lookup_timezone(city: str) -> Optional[str]:
+    """Resolves a city name or alias to its best IANA zone identifier.
+
+    Returns None for an unknown city rather than guess between close matches.
+    """
+    tz_identifier = TIMEZONE_INDEX.get(normalize_city(city))
+    if tz_identifier:
+        return tz_identifier
+    candidates = rank_timezones(city)
+    if not candidates:
+        return None
+    if len(candidates) > 1 and candidates[0][1] - candidates[1][1] < FUZZY_MIN_MARGIN:
+        return None
+    return candidates[0][0]
@@ -0,0 +1,96 @@
+import json
+import os
+from typing import Dict, List, Tuple
+
+TRANSLATE_BATCH_TOKEN_BUDGET = int(os.getenv("TRANSLATE_BATCH_TOKEN_BUDGET", "6000"))
+
+# (text index, target language)
+BatchItem = Tuple[int, str]
+
+RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "text_index": {"type": "INTEGER"},
+            "lang": {"type": "STRING"},
+            "translation": {"type": "STRING"},
+        },
+        "required": ["text_index", "lang", "translation"],
+    },
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+def plan_batches(texts: List[str], items: List[BatchItem], token_budget: int = TRANSLATE_BATCH_TOKEN_BUDGET) -> List[List[BatchItem]]:
+    """Splits (text, lang) items into batches whose estimated input + output tokens fit the budget.
+
+    Each source text is counted once per batch as input and once per
+    target language as output. A single oversized item still gets a batch
+    of its own.
+    """
+    batches: List[List[BatchItem]] = []
+    current: List[BatchItem] = []
+    current_texts = set()
+    current_tokens = 0
+    for text_index, lang in items:
+        text_tokens = estimate_tokens(texts[text_index])
+        cost = text_tokens if text_index in current_texts else 2 * text_tokens
+        if current and current_tokens + cost > token_budget:
+            batches.append(current)
+            current, current_texts, current_tokens = [], set(), 0
+            cost = 2 * text_tokens
+        current.append((text_index, lang))
+        current_texts.add(text_index)
+        current_tokens += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def build_batch_request(texts: List[str], batch: List[BatchItem]) -> dict:
+    """Builds one structured-output generateContent request for every item of the batch."""
+    text_indexes = sorted({text_index for text_index, _ in batch})
+    sources = "\n".join(
+        f"[{text_index}] {json.dumps(texts[text_index], ensure_ascii=False)}" for text_index in text_indexes
+    )
+    wanted = "\n".join(f"- text_index {text_index} into {lang}" for text_index, lang in batch)
+    prompt = (
+        "Translate the source texts below. Return one JSON entry per requested "
+        "translation with its text_index, lang and translation.\n\n"
+        f"Source texts:\n{sources}\n\nRequested translations:\n{wanted}"
+    )
+    return {
+        "contents": [{"parts": [{"text": prompt}]}],
+        "generationConfig": {
+            "responseMimeType": "application/json",
+            "responseSchema": RESPONSE_SCHEMA,
+        },
+    }
+
+
+def parse_batch_response(response_json: dict, batch: List[BatchItem]) -> Dict[BatchItem, str]:
+    """Maps each requested (text index, lang) of the batch to its translation.
+
+    Items the model left out are simply missing from the result.
+    """
+    try:
+        raw_text = response_json["candidates"][0]["content"]["parts"][0]["text"]
+        entries = json.loads(raw_text)
+    except (KeyError, IndexError, TypeError, json.JSONDecodeError):
+        return {}
+    wanted = {(text_index, lang.strip().lower()): (text_index, lang) for text_index, lang in batch}
+    results: Dict[BatchItem, str] = {}
+    for entry in entries if isinstance(entries, list) else []:
+        try:
+            item = wanted.get((int(entry["text_index"]), str(entry["lang"]).strip().lower()))
+            translation = entry["translation"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        if item is not None and isinstance(translation, str):
+            results[item] = translation
+    return results
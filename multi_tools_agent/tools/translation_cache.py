@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+TRANSLATION_CACHE_PATH = os.getenv("TRANSLATION_CACHE_PATH", "translation_cache.db")
+TRANSLATION_CACHE_TTL = float(os.getenv("TRANSLATION_CACHE_TTL", str(7 * 24 * 3600)))
+TRANSLATION_CACHE_MEMORY_SIZE = int(os.getenv("TRANSLATION_CACHE_MEMORY_SIZE", "1024"))
+# Expired rows are only deleted when looked up, so every this many puts a
+# process also sweeps the whole table
+TRANSLATION_CACHE_PURGE_EVERY = int(os.getenv("TRANSLATION_CACHE_PURGE_EVERY", "500"))
+# Several worker processes write the same database
+SQLITE_BUSY_TIMEOUT_MS = 5000
+
+
+def translation_cache_key(text: str, lang: str, model: str) -> str:
+    """Key on the normalized source text hash, target language and model."""
+    normalized_text = " ".join(unicodedata.normalize("NFC", text).split())
+    text_hash = hashlib.sha256(normalized_text.encode("utf-8")).hexdigest()
+    return f"{text_hash}:{lang.strip().lower()}:{model}"
+
+
+class TranslationCache:
+    """Two-tier translation memo: an in-memory LRU in front of a local SQLite table.
+
+    Entries expire after ttl seconds in both tiers. SQLite hits are promoted
+    into the memory tier with their remaining lifetime. get_async() and
+    put_async() are for the event loop: they answer memory hits inline and
+    run SQLite reads and writes in a worker thread.
+    """
+
+    def __init__(
+        self,
+        db_path: str = TRANSLATION_CACHE_PATH,
+        ttl: float = TRANSLATION_CACHE_TTL,
+        memory_size: int = TRANSLATION_CACHE_MEMORY_SIZE,
+        purge_every: int = TRANSLATION_CACHE_PURGE_EVERY,
+    ):
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.purge_every = purge_every
+        self._puts_since_purge = 0
+        self._memory: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        # The memory tier has its own lock so the event loop never waits on SQLite
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.db_path = db_path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._connection_pid: Optional[int] = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # One connection per process: a connection inherited across fork (gunicorn
+        # preload) must not be used, so each worker opens its own on first use.
+        if self._connection is None or self._connection_pid != os.getpid():
+            self._connection = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    def get(self, key: str) -> Optional[dict]:
+        value = self._get_memory(key)
+        if value is None:
+            value = self._get_disk(key)
+        return value
+
+    async def get_async(self, key: str) -> Optional[dict]:
+        value = self._get_memory(key)
+        if value is None:
+            value = await asyncio.to_thread(self._get_disk, key)
+        return value
+
+    def put(self, key: str, value: dict) -> None:
+        expires_at = time.time() + self.ttl
+        self._put_memory(key, expires_at, value)
+        self._put_disk(key, expires_at, value)
+
+    async def put_async(self, key: str, value: dict) -> None:
+        expires_at = time.time() + self.ttl
+        self._put_memory(key, expires_at, value)
+        await asyncio.to_thread(self._put_disk, key, expires_at, value)
+
+    def _get_memory(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return value
+            del self._memory[key]
+            self.expired += 1
+            return None
+
+    def _get_disk(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] <= now:
+                self._db.execute("DELETE FROM translations WHERE key = ?", (key,))
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            value, expires_at = json.loads(row[0]), row[1]
+            if expires_at <= now:
+                self.expired += 1
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember_locked(key, expires_at, value)
+            return value
+
+    def _put_memory(self, key: str, expires_at: float, value: dict) -> None:
+        with self._lock:
+            self._remember_locked(key, expires_at, value)
+
+    def _put_disk(self, key: str, expires_at: float, value: dict) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO translations (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at),
+            )
+            self._puts_since_purge += 1
+            if self.purge_every <= 0 or self._puts_since_purge < self.purge_every:
+                return
+            self._puts_since_purge = 0
+        self.purge_expired()
+
+    def purge_expired(self) -> int:
+        """Deletes expired rows from the SQLite tier and returns how many were removed."""
+        with self._db_lock:
+            cursor = self._db.execute("DELETE FROM translations WHERE expires_at <= ?", (time.time(),))
+            return cursor.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def _remember_locked(self, key: str, expires_at: float, value: dict) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+
+translation_cache = TranslationCache()
@@ -0,0 +1,100 @@
+import os
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from .admission import upstream_limiter
+from .clients import get_elevenlabs_client
+from .metrics import TTS_BYTES, track_upstream
+from .voice_settings import to_elevenlabs_voice_settings
+
+TTS_CHUNKED = os.getenv("TTS_CHUNKED", "false").lower() == "true"
+# Texts shorter than this are synthesized in one request
+TTS_CHUNK_MIN_CHARS = int(os.getenv("TTS_CHUNK_MIN_CHARS", "400"))
+TTS_CHUNK_MAX_CHARS = int(os.getenv("TTS_CHUNK_MAX_CHARS", "250"))
+TTS_CHUNK_CONCURRENCY = int(os.getenv("TTS_CHUNK_CONCURRENCY", "4"))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…。！？])\s+")
+
+tts_chunk_executor = ThreadPoolExecutor(max_workers=TTS_CHUNK_CONCURRENCY, thread_name_prefix="tts-chunk")
+
+
+def split_sentences(text: str, max_chars: int = TTS_CHUNK_MAX_CHARS) -> List[str]:
+    """Splits text at sentence boundaries, packing consecutive sentences into chunks of up to max_chars.
+
+    A single sentence longer than max_chars stays whole rather than being cut
+    mid-sentence, which would break the prosody.
+    """
+    chunks: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_END.split(text.strip()):
+        if not sentence:
+            continue
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _strip_id3(audio: bytes) -> bytes:
+    # Only the first chunk keeps its ID3v2 tag; later ones would appear mid-stream.
+    if len(audio) >= 10 and audio[:3] == b"ID3":
+        size = (audio[6] << 21) | (audio[7] << 14) | (audio[8] << 7) | audio[9]
+        return audio[10 + size:]
+    return audio
+
+
+def _synthesize_chunk(
+    chunks: List[str], index: int, voice_id: str, model_id: str, output_format: str, voice_settings: Optional[dict]
+) -> bytes:
+    # Paced with every other ElevenLabs call (UPSTREAM_RATE_LIMITS)
+    upstream_limiter.wait("elevenlabs")
+    with track_upstream("elevenlabs"):
+        audio = get_elevenlabs_client().text_to_speech.convert(
+            text=chunks[index],
+            voice_id=voice_id,
+            model_id=model_id,
+            output_format=output_format,
+            voice_settings=to_elevenlabs_voice_settings(voice_settings),
+            # Neighbouring text keeps intonation continuous across chunk boundaries
+            previous_text=chunks[index - 1] if index > 0 else None,
+            next_text=chunks[index + 1] if index + 1 < len(chunks) else None,
+        )
+        data = b"".join(audio)
+    TTS_BYTES.inc(len(data))
+    return data if index == 0 else _strip_id3(data)
+
+
+def synthesize_chunked(
+    text: str, voice_id: str, model_id: str, output_format: str, voice_settings: Optional[dict], output_path: Path
+) -> Path:
+    """Synthesizes text sentence chunk by sentence chunk in parallel and stitches the MP3s in order.
+
+    Chunks are written to a part file in order as soon as every earlier
+    chunk is done, so the file grows from the start while later chunks are
+    still being synthesized; it is moved to output_path once complete.
+    """
+    chunks = split_sentences(text)
+    futures = [
+        tts_chunk_executor.submit(_synthesize_chunk, chunks, index, voice_id, model_id, output_format, voice_settings)
+        for index in range(len(chunks))
+    ]
+    part_path = output_path.with_name(f"{output_path.name}.{uuid.uuid4().hex}.part")
+    try:
+        with open(part_path, "wb") as f:
+            for future in futures:
+                f.write(future.result())
+                f.flush()
+        os.replace(part_path, output_path)
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        part_path.unlink(missing_ok=True)
+        raise
+    return output_path
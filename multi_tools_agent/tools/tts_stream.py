@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from typing import Iterator, Optional
+
+from .admission import upstream_limiter
+from .audio_cache import audio_cache
+from .clients import get_elevenlabs_client
+from .metrics import TTS_BYTES, track_upstream
+from .voice_settings import to_elevenlabs_voice_settings
+
+STREAM_ROUTE = "/tts/stream"
+AUDIO_ROUTE = "/audio"
+STREAM_CHUNK_SIZE = 16 * 1024
+# A request for a clip another request is already synthesizing follows its
+# part file; it gives up after this many seconds without new bytes, and a
+# synthesis lock this long without progress is taken over (crashed worker).
+TTS_STREAM_FOLLOW_TIMEOUT = float(os.getenv("TTS_STREAM_FOLLOW_TIMEOUT", "30"))
+TTS_STREAM_LOCK_TIMEOUT = float(os.getenv("TTS_STREAM_LOCK_TIMEOUT", "120"))
+_FOLLOW_POLL_INTERVAL = 0.05
+
+_CLIP_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+logger = logging.getLogger(__name__)
+
+
+def stream_url(clip_id: str) -> str:
+    return f"{STREAM_ROUTE}/{clip_id}"
+
+
+def audio_url(clip_id: str) -> str:
+    return f"{AUDIO_ROUTE}/{clip_id}"
+
+
+def is_valid_clip_id(clip_id: str) -> bool:
+    return bool(_CLIP_ID_PATTERN.match(clip_id))
+
+
+def _request_path(clip_id: str):
+    return audio_cache.cache_dir / f"{clip_id}.json"
+
+
+def write_stream_request(
+    clip_id: str, text: str, voice_id: str, model_id: str, output_format: str, voice_settings: Optional[dict] = None
+) -> None:
+    """Records what to synthesize for clip_id; the stream endpoint reads it on first fetch.
+
+    Kept on disk next to the clips so any process sharing the output
+    directory can serve the stream. Written to a temporary file and renamed,
+    so a concurrent reader never sees it half-written; removed once the clip
+    is in the cache.
+    """
+    request = {
+        "text": text,
+        "voice_id": voice_id,
+        "model_id": model_id,
+        "output_format": output_format,
+        "voice_settings": voice_settings,
+    }
+    request_path = _request_path(clip_id)
+    tmp_path = request_path.with_name(f"{clip_id}.{uuid.uuid4().hex}.json.tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(request, f, ensure_ascii=False)
+        os.replace(tmp_path, request_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _lock_path(clip_id: str):
+    return audio_cache.cache_dir / f"{clip_id}.lock"
+
+
+def _part_path(clip_id: str):
+    return audio_cache.cache_dir / f"{clip_id}.part"
+
+
+def is_pending_clip(clip_id: str) -> bool:
+    """True when clip_id was handed out for streaming but is not in the cache yet."""
+    return _request_path(clip_id).exists()
+
+
+def _read_stream_request(clip_id: str) -> Optional[dict]:
+    try:
+        with open(_request_path(clip_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _iter_file(path) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while chunk := f.read(STREAM_CHUNK_SIZE):
+            yield chunk
+
+
+def _try_lock(clip_id: str) -> bool:
+    # O_EXCL makes the lock file the per-clip singleflight across every worker sharing the directory
+    lock_path = _lock_path(clip_id)
+    for _ in range(2):
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            pass
+        try:
+            last_progress = max(
+                path.stat().st_mtime for path in (lock_path, _part_path(clip_id)) if path.exists()
+            )
+        except (ValueError, FileNotFoundError):
+            continue
+        if time.time() - last_progress < TTS_STREAM_LOCK_TIMEOUT:
+            return False
+        logger.warning("Taking over a stale synthesis lock", extra={"clip_id": clip_id})
+        lock_path.unlink(missing_ok=True)
+    return False
+
+
+def _iter_following(clip_id: str) -> Iterator[bytes]:
+    # Another request is synthesizing the clip: read its part file as it grows.
+    # The writer renames it into the cache when done, which leaves this open
+    # handle reading the same file; the lock is removed after that.
+    final_path = audio_cache.path_for(clip_id)
+    deadline = time.monotonic() + TTS_STREAM_FOLLOW_TIMEOUT
+    f = None
+    try:
+        while f is None:
+            try:
+                f = open(_part_path(clip_id), "rb")
+            except FileNotFoundError:
+                if final_path.exists():
+                    yield from _iter_file(final_path)
+                    return
+                if not _lock_path(clip_id).exists() or time.monotonic() > deadline:
+                    return
+                time.sleep(_FOLLOW_POLL_INTERVAL)
+        while True:
+            chunk = f.read(STREAM_CHUNK_SIZE)
+            if chunk:
+                deadline = time.monotonic() + TTS_STREAM_FOLLOW_TIMEOUT
+                yield chunk
+            elif not _lock_path(clip_id).exists():
+                while chunk := f.read(STREAM_CHUNK_SIZE):
+                    yield chunk
+                return
+            elif time.monotonic() > deadline:
+                return
+            else:
+                time.sleep(_FOLLOW_POLL_INTERVAL)
+    finally:
+        if f is not None:
+            f.close()
+
+
+def _iter_stream(clip_id: str, request: dict) -> Iterator[bytes]:
+    # The lock is taken on first iteration, so a response that is never sent holds none
+    if not _try_lock(clip_id):
+        yield from _iter_following(clip_id)
+        return
+    try:
+        yield from _iter_synthesis(clip_id, request)
+    finally:
+        _lock_path(clip_id).unlink(missing_ok=True)
+
+
+def _iter_synthesis(clip_id: str, request: dict) -> Iterator[bytes]:
+    # Forward MP3 frames as ElevenLabs produces them while teeing them to the
+    # part file, which is promoted into the cache once complete.
+    logger.debug("Calling ElevenLabs Text2Speech streaming service", extra={"clip_id": clip_id})
+    client = get_elevenlabs_client()
+    final_path = audio_cache.path_for(clip_id)
+    part_path = _part_path(clip_id)
+    completed = False
+    try:
+        upstream_limiter.wait("elevenlabs")
+        with open(part_path, "wb") as f, track_upstream("elevenlabs_stream"):
+            for chunk in client.text_to_speech.stream(
+                text=request["text"],
+                voice_id=request["voice_id"],
+                model_id=request["model_id"],
+                output_format=request["output_format"],
+                voice_settings=to_elevenlabs_voice_settings(request.get("voice_settings")),
+            ):
+                if not chunk:
+                    continue
+                f.write(chunk)
+                TTS_BYTES.inc(len(chunk))
+                yield chunk
+        os.replace(part_path, final_path)
+        audio_cache.put(clip_id)
+        completed = True
+        _request_path(clip_id).unlink(missing_ok=True)
+        logger.debug("Saved streamed clip at %s", final_path, extra={"clip_id": clip_id})
+    finally:
+        if not completed:
+            part_path.unlink(missing_ok=True)
+
+
+def stream_clip(clip_id: str) -> Optional[Iterator[bytes]]:
+    """Returns an iterator over the clip's MP3 bytes, or None when the clip is unknown.
+
+    A cached clip is read back from disk; otherwise the recorded request is
+    synthesized with ElevenLabs' streaming API, once: concurrent requests for
+    the same clip, from any worker, follow the synthesis in progress.
+    """
+    if not is_valid_clip_id(clip_id):
+        return None
+    cached_path = audio_cache.get(clip_id)
+    if cached_path:
+        return _iter_file(cached_path)
+    request = _read_stream_request(clip_id)
+    if request is None:
+        return None
+    return _iter_stream(clip_id, request)
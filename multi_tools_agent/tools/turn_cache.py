@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from google.genai import types
+
+from .audio_cache import audio_cache
+from .tts_stream import is_pending_clip
+from .voice_settings import VOICE_STATE_KEYS
+
+TURN_CACHE = os.getenv("TURN_CACHE", "false").lower() == "true"
+TURN_CACHE_MAX_ENTRIES = int(os.getenv("TURN_CACHE_MAX_ENTRIES", "2048"))
+# Freshness of a turn that used no tools (plain model answers, greetings);
+# 0 keeps them out of the cache, their wording is rarely worth replaying
+TURN_CACHE_DEFAULT_TTL = float(os.getenv("TURN_CACHE_DEFAULT_TTL", "0"))
+
+# Per-tool freshness in seconds; a cached turn lives as long as its least
+# fresh tool allows. 0 means turns using the tool are never cached, and so
+# are turns using a tool missing from this table.
+TOOL_FRESHNESS: Dict[str, float] = {
+    "get_current_time": 0,
+    "get_current_time_for_cities": 0,
+    "get_weather": float(os.getenv("TURN_CACHE_WEATHER_TTL", "60")),
+    "get_weather_for_cities": float(os.getenv("TURN_CACHE_WEATHER_TTL", "60")),
+    "translate_response": 24 * 3600,
+    "translate_response_batch": 24 * 3600,
+    "get_voice_response": 24 * 3600,
+}
+
+# The clip ID in a get_voice_response result ("... audio at:/audio/<id>")
+_CLIP_ID = re.compile(r"/([0-9a-f]{64})\b")
+
+# Session state that changes the answer to an identical message
+TURN_CACHE_STATE_KEYS = ("user_preference_temperature_unit",) + VOICE_STATE_KEYS
+
+
+class _Recording:
+    def __init__(self, key: str):
+        self.key = key
+        self.tools = set()
+        self.text: Optional[str] = None
+        self.voice_response: Optional[dict] = None
+
+
+class TurnCache:
+    """Opt-in exact-match cache of whole agent turns, wired in as root_agent callbacks.
+
+    Only the first turn of a session is looked up or stored: later messages
+    ("yes", "translate that") depend on the conversation so far, and the
+    answer to them must never come from another user's session.
+
+    before_agent looks the normalized message (plus the relevant session
+    state) up and replays a hit as one model event: the final text, preceded
+    by the get_voice_response function response when the turn produced audio,
+    so clients find the same audio reference. A turn whose clip has since left
+    the audio cache is a miss. On a miss the tool and model
+    callbacks record the turn and after_agent stores it with the TTL of its
+    least fresh tool.
+    """
+
+    def __init__(self, max_entries: int = TURN_CACHE_MAX_ENTRIES, enabled: bool = TURN_CACHE):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._recordings: Dict[str, _Recording] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+
+    @staticmethod
+    def turn_key(message: str, state) -> str:
+        normalized_message = " ".join(message.lower().split()).rstrip("?!. ")
+        relevant_state = {key: state.get(key) for key in TURN_CACHE_STATE_KEYS}
+        payload = json.dumps([normalized_message, relevant_state], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _is_first_turn(callback_context) -> bool:
+        # The session already holds this turn's user event, but nothing from earlier invocations
+        return all(event.invocation_id == callback_context.invocation_id for event in callback_context.session.events)
+
+    async def before_agent(self, callback_context) -> Optional[types.Content]:
+        user_content = callback_context.user_content
+        if not self.enabled or not user_content or not user_content.parts:
+            return None
+        message = " ".join(part.text for part in user_content.parts if part.text)
+        if not message or not self._is_first_turn(callback_context):
+            return None
+        key = self.turn_key(message, callback_context.state)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic() and self._clip_available(entry[1]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                turn = entry[1]
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                self._recordings[callback_context.invocation_id] = _Recording(key)
+                # Turns that failed before after_agent never pop their recording
+                while len(self._recordings) > self.max_entries:
+                    self._recordings.pop(next(iter(self._recordings)))
+                return None
+
+        parts = []
+        if turn["voice_response"] is not None:
+            parts.append(types.Part(function_response=types.FunctionResponse(
+                name="get_voice_response", response=turn["voice_response"],
+            )))
+        parts.append(types.Part(text=turn["text"]))
+        return types.Content(role="model", parts=parts)
+
+    @staticmethod
+    def _clip_available(turn: dict) -> bool:
+        if turn["voice_response"] is None:
+            return True
+        match = _CLIP_ID.search(json.dumps(turn["voice_response"]))
+        if match is None:
+            return False
+        clip_id = match.group(1)
+        return audio_cache.get(clip_id) is not None or is_pending_clip(clip_id)
+
+    def after_tool(self, tool, args, tool_context, tool_response):
+        recording = self._recordings.get(tool_context.invocation_id)
+        if recording is not None:
+            recording.tools.add(tool.name)
+            if tool.name == "get_voice_response" and isinstance(tool_response, dict):
+                recording.voice_response = tool_response
+        return None
+
+    def after_model(self, callback_context, llm_response):
+        recording = self._recordings.get(callback_context.invocation_id)
+        content = llm_response.content
+        if recording is None or llm_response.partial or not content or not content.parts:
+            return None
+        text = "".join(part.text for part in content.parts if part.text and not part.thought)
+        if text and not any(part.function_call for part in content.parts):
+            recording.text = text
+        return None
+
+    def after_agent(self, callback_context):
+        recording = self._recordings.pop(callback_context.invocation_id, None)
+        if recording is None or not recording.text:
+            return None
+        ttl = min((TOOL_FRESHNESS.get(tool, 0) for tool in recording.tools), default=TURN_CACHE_DEFAULT_TTL)
+        if ttl <= 0:
+            return None
+        with self._lock:
+            self._entries[recording.key] = (
+                time.monotonic() + ttl,
+                {"text": recording.text, "voice_response": recording.voice_response},
+            )
+            self._entries.move_to_end(recording.key)
+            self.stored += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stored": self.stored,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+turn_cache = TurnCache()
@@ -0,0 +1,59 @@
+import os
+from typing import Optional, Tuple
+
+# Session state keys written by the client (see apps/app.py)
+VOICE_ID_STATE_KEY = "voice_id"
+VOICE_SETTINGS_STATE_KEY = "voice_settings"
+VOICE_OUTPUT_FORMAT_STATE_KEY = "voice_output_format"
+VOICE_STATE_KEYS = (VOICE_ID_STATE_KEY, VOICE_SETTINGS_STATE_KEY, VOICE_OUTPUT_FORMAT_STATE_KEY)
+
+DEFAULT_VOICE_ID = os.getenv("TTS_DEFAULT_VOICE_ID", "JBFqnCBsd6RMkjVDRZzb")
+
+# Lower-bitrate formats let clients on slow links trade quality for size
+ALLOWED_OUTPUT_FORMATS = (
+    "mp3_44100_192",
+    "mp3_44100_128",
+    "mp3_44100_96",
+    "mp3_44100_64",
+    "mp3_44100_32",
+    "mp3_22050_32",
+)
+
+# ElevenLabs voice setting -> (min, max)
+VOICE_SETTING_RANGES = {
+    "stability": (0.0, 1.0),
+    "similarity_boost": (0.0, 1.0),
+    "style": (0.0, 1.0),
+    "speed": (0.7, 1.2),
+}
+
+
+def normalize_voice_settings(settings) -> Optional[dict]:
+    """Keeps the known ElevenLabs settings, clamped to their valid ranges; None when nothing is set."""
+    if not isinstance(settings, dict):
+        return None
+    normalized = {}
+    for name, (low, high) in VOICE_SETTING_RANGES.items():
+        if isinstance(settings.get(name), (int, float)):
+            normalized[name] = round(min(max(float(settings[name]), low), high), 2)
+    if isinstance(settings.get("use_speaker_boost"), bool):
+        normalized["use_speaker_boost"] = settings["use_speaker_boost"]
+    return normalized or None
+
+
+def read_voice_preferences(state, default_output_format: str) -> Tuple[str, str, Optional[dict]]:
+    """Returns (voice_id, output_format, voice_settings) from session state, with defaults."""
+    voice_id = state.get(VOICE_ID_STATE_KEY) or DEFAULT_VOICE_ID
+    output_format = state.get(VOICE_OUTPUT_FORMAT_STATE_KEY)
+    if output_format not in ALLOWED_OUTPUT_FORMATS:
+        output_format = default_output_format
+    return voice_id, output_format, normalize_voice_settings(state.get(VOICE_SETTINGS_STATE_KEY))
+
+
+def to_elevenlabs_voice_settings(voice_settings: Optional[dict]):
+    """Builds the SDK VoiceSettings object (None keeps the voice's stored defaults)."""
+    if not voice_settings:
+        return None
+    from elevenlabs import VoiceSettings
+
+    return VoiceSettings(**voice_settings)
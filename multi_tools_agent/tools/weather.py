@@ -0,0 +1,155 @@
+import asyncio
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote, unquote
+
+WEATHER_PROVIDER = os.getenv("WEATHER_PROVIDER", "mock")
+WEATHER_PROVIDER_URL = os.getenv("WEATHER_PROVIDER_URL", "http://127.0.0.1:8765")
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "300"))
+# Cities come from user input, so the cache keeps only the most recently used ones
+WEATHER_CACHE_MAX_ENTRIES = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "1024"))
+
+# Mock weather data (always stored in Celsius internally)
+MOCK_WEATHER_DB: Dict[str, dict] = {
+    "newyork": {"temp_c": 25, "condition": "sunny"},
+    "london": {"temp_c": 15, "condition": "cloudy"},
+    "tokyo": {"temp_c": 18, "condition": "light rain"},
+}
+
+
+class WeatherProvider(ABC):
+    """Source of current weather, keyed by the normalized city name used in get_weather."""
+
+    @abstractmethod
+    async def fetch(self, city_normalized: str) -> Optional[dict]:
+        """Returns {"temp_c": float, "condition": str}, or None for an unknown city."""
+
+
+class MockWeatherProvider(WeatherProvider):
+    def __init__(self, db: Dict[str, dict] = MOCK_WEATHER_DB):
+        self.db = db
+
+    async def fetch(self, city_normalized: str) -> Optional[dict]:
+        return self.db.get(city_normalized)
+
+
+class HttpWeatherProvider(WeatherProvider):
+    """Fetches GET {base_url}/weather/{city}; pairs with serve_mock_weather for local testing."""
+
+    def __init__(self, base_url: str = WEATHER_PROVIDER_URL):
+        self.base_url = base_url.rstrip("/")
+
+    async def fetch(self, city_normalized: str) -> Optional[dict]:
+        from .http_client import get_http_client
+
+        response = await get_http_client().get(f"{self.base_url}/weather/{quote(city_normalized, safe='')}")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+
+class WeatherCache:
+    """Per-city TTL cache in front of a provider with request coalescing.
+
+    Concurrent lookups of the same city while a fetch is in flight await
+    that fetch instead of starting their own (singleflight), so each city
+    costs at most one upstream call per TTL window. The fetch is a task of
+    its own: a caller that is cancelled stops waiting, the others still get
+    the result. Unknown cities are cached too, so at most max_entries cities
+    are kept, least recently used first out, and expired entries are dropped
+    when looked up.
+    """
+
+    def __init__(self, provider: WeatherProvider, ttl: float = WEATHER_CACHE_TTL, max_entries: int = WEATHER_CACHE_MAX_ENTRIES):
+        self.provider = provider
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Optional[dict]]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(self, city_normalized: str) -> Optional[dict]:
+        entry = self._entries.get(city_normalized)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(city_normalized)
+                self.hits += 1
+                return entry[1]
+            del self._entries[city_normalized]
+        in_flight = self._in_flight.get(city_normalized)
+        if in_flight is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # The fetch runs in its own task, so cancelling any one caller
+            # (its client went away) neither cancels it nor the other callers.
+            in_flight = asyncio.ensure_future(self._fetch(city_normalized))
+            self._in_flight[city_normalized] = in_flight
+            in_flight.add_done_callback(lambda task: self._fetch_done(city_normalized, task))
+        return await asyncio.shield(in_flight)
+
+    async def _fetch(self, city_normalized: str) -> Optional[dict]:
+        data = await self.provider.fetch(city_normalized)
+        self._entries[city_normalized] = (time.monotonic() + self.ttl, data)
+        self._entries.move_to_end(city_normalized)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return data
+
+    def _fetch_done(self, city_normalized: str, task: asyncio.Future) -> None:
+        del self._in_flight[city_normalized]
+        if not task.cancelled():
+            # Callers receive the exception; keep the loop from warning when none are left.
+            task.exception()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+def build_weather_provider(name: str = WEATHER_PROVIDER) -> WeatherProvider:
+    if name == "http":
+        return HttpWeatherProvider()
+    return MockWeatherProvider()
+
+
+weather_cache = WeatherCache(build_weather_provider())
+
+
+def serve_mock_weather(host: str = "127.0.0.1", port: int = 8765, db: Dict[str, dict] = MOCK_WEATHER_DB) -> None:
+    """Runs a local HTTP stand-in for a weather service, serving GET /weather/{city} from db."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            prefix = "/weather/"
+            data = db.get(unquote(self.path[len(prefix):])) if self.path.startswith(prefix) else None
+            body = json.dumps(data if data is not None else {"error": "unknown city"}).encode("utf-8")
+            self.send_response(200 if data is not None else 404)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    print(f"Serving mock weather data on http://{host}:{port}/weather/<city>")
+    ThreadingHTTPServer((host, port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    serve_mock_weather()
@@ -0,0 +1,140 @@
+"""
+Maintenance for the local SQLite session store.
+
+ADK maps sqlite:// session URLs to SqliteSessionService, which opens a
+short-lived aiosqlite connection per operation rather than pooling them; these
+helpers work on the events and sessions tables of its schema.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# Sessions with more stored events than the threshold are cut back to the
+# most recent SESSION_COMPACTION_KEEP events.
+SESSION_COMPACTION_THRESHOLD = int(os.getenv("SESSION_COMPACTION_THRESHOLD", "200"))
+SESSION_COMPACTION_KEEP = int(os.getenv("SESSION_COMPACTION_KEEP", "50"))
+SESSION_COMPACTION_INTERVAL = float(os.getenv("SESSION_COMPACTION_INTERVAL", "300"))
+SESSION_ARCHIVE_EVENTS = os.getenv("SESSION_ARCHIVE_EVENTS", "true").lower() == "true"
+SQLITE_BUSY_TIMEOUT_MS = 5000
+
+logger = logging.getLogger(__name__)
+
+
+def sqlite_path_from_url(db_url: str) -> Optional[str]:
+    """Returns the file path of a sqlite:/// (or sqlite+driver:///) URL, None for other databases."""
+    scheme, sep, path = db_url.partition(":///")
+    if not sep or not scheme.startswith("sqlite"):
+        return None
+    return path
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    return row is not None
+
+
+def prepare_session_db(db_path: str) -> None:
+    """Switches the session database to WAL mode and adds lookup indexes.
+
+    WAL is a persistent property of the database file, so every connection
+    the ADK session service opens later also runs in WAL mode: readers no
+    longer block the writer appending events. The indexes are only created
+    once ADK has created its tables, which is why this also runs from the
+    compaction thread.
+    """
+    conn = _connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        if _table_exists(conn, "events"):
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_events_app_user_session "
+                "ON events (app_name, user_id, session_id, timestamp)"
+            )
+        if _table_exists(conn, "sessions"):
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sessions_app_user "
+                "ON sessions (app_name, user_id, update_time)"
+            )
+    finally:
+        conn.close()
+
+
+def compact_sessions(
+    db_path: str,
+    threshold: int = SESSION_COMPACTION_THRESHOLD,
+    keep: int = SESSION_COMPACTION_KEEP,
+    archive: bool = SESSION_ARCHIVE_EVENTS,
+) -> int:
+    """Moves all but the newest `keep` events of oversized sessions out of the events table.
+
+    Session state lives in the sessions/app_states/user_states tables and is
+    left untouched; only the replayed event history shrinks. With archive
+    enabled, the removed rows are copied into events_archive first.
+
+    Returns:
+        int: The number of events removed from the events table.
+    """
+    conn = _connect(db_path)
+    removed = 0
+    try:
+        if not _table_exists(conn, "events"):
+            return 0
+        if archive:
+            conn.execute("CREATE TABLE IF NOT EXISTS events_archive AS SELECT * FROM events WHERE 0")
+        oversized = conn.execute(
+            "SELECT app_name, user_id, session_id FROM events "
+            "GROUP BY app_name, user_id, session_id HAVING COUNT(*) > ?",
+            (threshold,),
+        ).fetchall()
+        for app_name, user_id, session_id in oversized:
+            key = (app_name, user_id, session_id)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cutoff = conn.execute(
+                    "SELECT timestamp FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? "
+                    "ORDER BY timestamp DESC LIMIT 1 OFFSET ?",
+                    (*key, keep - 1),
+                ).fetchone()
+                if cutoff is None:
+                    conn.execute("COMMIT")
+                    continue
+                where = "app_name = ? AND user_id = ? AND session_id = ? AND timestamp < ?"
+                if archive:
+                    conn.execute(f"INSERT INTO events_archive SELECT * FROM events WHERE {where}", (*key, cutoff[0]))
+                removed += conn.execute(f"DELETE FROM events WHERE {where}", (*key, cutoff[0])).rowcount
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    finally:
+        conn.close()
+    return removed
+
+
+def start_compaction_thread(db_path: str, interval: float = SESSION_COMPACTION_INTERVAL) -> threading.Thread:
+    """Runs prepare_session_db and compact_sessions every `interval` seconds in a daemon thread."""
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                prepare_session_db(db_path)
+                removed = compact_sessions(db_path)
+                if removed:
+                    logger.info("Session compaction removed %d events from %s", removed, db_path)
+            except sqlite3.Error as e:
+                logger.warning("Session compaction failed: %s", e)
+
+    thread = threading.Thread(target=run, name="session-compaction", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# The modules under test read their configuration, and create their caches,
+# when multi_tools_agent is first imported: keep those files out of the tree.
+_WORK_DIR = tempfile.mkdtemp(prefix="multi-tools-agent-tests-")
+os.environ.setdefault("AUDIO_CACHE_DIR", os.path.join(_WORK_DIR, "output"))
+os.environ.setdefault("TRANSLATION_CACHE_PATH", os.path.join(_WORK_DIR, "translation_cache.db"))
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
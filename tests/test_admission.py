@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import pytest
+
+from multi_tools_agent.tools import admission
+from multi_tools_agent.tools.admission import KeyedTokenBuckets, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_bucket_allows_a_burst_then_rejects(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.reserve()[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = bucket.reserve()
+    assert not allowed
+    assert retry_after == pytest.approx(0.5)
+
+
+def test_bucket_refills_at_rate_up_to_burst(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    for _ in range(3):
+        bucket.reserve()
+    clock[0] += 0.5
+    assert bucket.reserve() == (True, 0.0)
+    assert not bucket.reserve()[0]
+    clock[0] += 60
+    assert [bucket.reserve()[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_bucket_reserves_ahead_within_max_wait(clock):
+    bucket = TokenBucket(rate=1, burst=1)
+    assert bucket.reserve() == (True, 0.0)
+    allowed, wait = bucket.reserve(max_wait=2)
+    assert allowed and wait == pytest.approx(1.0)
+    # The reservation above already took the next token
+    allowed, wait = bucket.reserve(max_wait=1.5)
+    assert not allowed and wait == pytest.approx(2.0)
+
+
+def test_bucket_refund_gives_back_a_token(clock):
+    bucket = TokenBucket(rate=1, burst=1)
+    bucket.reserve()
+    bucket.refund()
+    assert bucket.reserve() == (True, 0.0)
+    # Never above burst
+    bucket.refund()
+    bucket.refund()
+    assert bucket.reserve()[0]
+    assert not bucket.reserve()[0]
+
+
+def test_bucket_without_rate_is_unlimited(clock):
+    bucket = TokenBucket(rate=0, burst=1)
+    assert all(bucket.reserve() == (True, 0.0) for _ in range(100))
+
+
+def test_keyed_buckets_are_independent(clock):
+    buckets = KeyedTokenBuckets(rate=1, burst=1)
+    assert buckets.reserve("alice")[0]
+    assert not buckets.reserve("alice")[0]
+    assert buckets.reserve("bob")[0]
+
+
+def test_keyed_buckets_forget_least_recently_seen_keys(clock):
+    buckets = KeyedTokenBuckets(rate=1, burst=1, max_keys=2)
+    buckets.reserve("alice")
+    buckets.reserve("bob")
+    buckets.reserve("alice")
+    buckets.reserve("carol")
+    assert list(buckets._buckets) == ["alice", "carol"]
+    # bob starts over with a full bucket
+    assert buckets.reserve("bob")[0]
@@ -0,0 +1,116 @@
+import json
+import os
+import time
+
+from multi_tools_agent.tools import audio_cache as audio_cache_module
+from multi_tools_agent.tools.audio_cache import INDEX_FILE_NAME, AudioCache, audio_cache_key
+
+
+def _key(n: int) -> str:
+    return f"{n:064x}"
+
+
+def _write_clip(cache: AudioCache, key: str, size: int = 100, mtime: float = None) -> None:
+    path = cache.path_for(key)
+    path.write_bytes(b"\xff" * size)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def _put(cache: AudioCache, key: str, size: int = 100) -> None:
+    _write_clip(cache, key, size)
+    cache.put(key)
+
+
+def test_cache_key_covers_every_input():
+    base = audio_cache_key("hi", "voice", "model", "mp3_44100_128", {"speed": 1.0})
+    assert base == audio_cache_key("hi", "voice", "model", "mp3_44100_128", {"speed": 1.0})
+    assert base != audio_cache_key("hi", "voice", "model", "mp3_44100_128", {"speed": 1.1})
+    assert base != audio_cache_key("hi", "voice", "model", "mp3_22050_32", {"speed": 1.0})
+    assert audio_cache_key("hi", "v", "m", "f") == audio_cache_key("hi", "v", "m", "f", {})
+
+
+def test_evicts_least_recently_used_clip(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=250)
+    _put(cache, _key(1))
+    _put(cache, _key(2))
+    assert cache.get(_key(1)) is not None
+    _put(cache, _key(3))
+    assert not cache.path_for(_key(2)).exists()
+    assert cache.get(_key(2)) is None
+    assert cache.get(_key(1)) is not None and cache.get(_key(3)) is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 200
+
+
+def test_keeps_a_single_clip_larger_than_the_budget(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=50)
+    _put(cache, _key(1))
+    assert cache.get(_key(1)) is not None
+
+
+def test_forgets_clips_removed_behind_its_back(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=1000)
+    _put(cache, _key(1))
+    cache.path_for(_key(1)).unlink()
+    assert cache.get(_key(1)) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_order_survives_a_restart(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=250)
+    _put(cache, _key(1))
+    _put(cache, _key(2))
+    cache.get(_key(1))
+    _put(cache, _key(3))
+
+    restarted = AudioCache(str(tmp_path), max_bytes=250)
+    assert list(restarted._entries) == [_key(1), _key(3)]
+
+
+def test_adopts_clips_written_by_another_worker_in_age_order(tmp_path):
+    now = time.time()
+    cache = AudioCache(str(tmp_path), max_bytes=300)
+    _put(cache, _key(1))
+    cache._entries[_key(1)] = (100, now - 60)
+    os.utime(cache.path_for(_key(1)), (now - 60, now - 60))
+    # Another worker sharing the directory wrote these
+    _write_clip(cache, _key(2), mtime=now - 120)
+    _write_clip(cache, _key(3), mtime=now - 1)
+    _put(cache, _key(4))
+    # The oldest clip goes first, not whichever ones this worker hadn't seen
+    assert list(cache._entries) == [_key(1), _key(3), _key(4)]
+    assert not cache.path_for(_key(2)).exists()
+
+
+def test_other_workers_see_each_others_clips(tmp_path):
+    first = AudioCache(str(tmp_path), max_bytes=1000)
+    second = AudioCache(str(tmp_path), max_bytes=1000)
+    _put(first, _key(1))
+    assert second.get(_key(1)) is not None
+
+
+def test_malformed_index_is_rebuilt_from_the_directory(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=1000)
+    _put(cache, _key(1))
+    for stored in ("not json", json.dumps({"a": 1}), json.dumps([["../etc/passwd", 1]])):
+        (tmp_path / INDEX_FILE_NAME).write_text(stored)
+        assert list(AudioCache(str(tmp_path), max_bytes=1000)._entries) == [_key(1)]
+
+
+def test_sync_removes_stale_requests_and_part_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_cache_module, "AUDIO_CACHE_REQUEST_TTL", 3600)
+    monkeypatch.setattr(audio_cache_module, "AUDIO_CACHE_PART_TTL", 60)
+    old = time.time() - 7200
+    stale = [tmp_path / f"{_key(1)}.json", tmp_path / f"{_key(2)}.part", tmp_path / f"{_key(3)}.lock"]
+    fresh = [tmp_path / f"{_key(4)}.json", tmp_path / f"{_key(5)}.part"]
+    unrelated = [tmp_path / "notes.json"]
+    for path in stale + unrelated:
+        path.write_text("{}")
+        os.utime(path, (old, old))
+    for path in fresh:
+        path.write_text("{}")
+
+    AudioCache(str(tmp_path), max_bytes=1000)
+    assert not any(path.exists() for path in stale)
+    assert all(path.exists() for path in fresh + unrelated)
@@ -0,0 +1,54 @@
+import pytest
+
+from multi_tools_agent.tools.timezones import FUZZY_MIN_SCORE, lookup_timezone, normalize_city, rank_timezones
+
+
+def test_normalize_city_strips_accents_and_separators():
+    assert normalize_city("  São_Paulo ") == "sao paulo"
+    assert normalize_city("St. Petersburg") == "st petersburg"
+    assert normalize_city("Port-au-Prince") == "port au prince"
+
+
+@pytest.mark.parametrize("city, zone", [
+    ("London", "Europe/London"),
+    ("new york", "America/New_York"),
+    ("NYC", "America/New_York"),
+    ("São Paulo", "America/Sao_Paulo"),
+    ("US/Eastern", "US/Eastern"),
+])
+def test_exact_names_and_aliases(city, zone):
+    assert lookup_timezone(city) == zone
+
+
+@pytest.mark.parametrize("city, zone", [
+    ("kolkat", "Asia/Kolkata"),
+    ("Londn", "Europe/London"),
+    ("Tokio", "Asia/Tokyo"),
+    ("sydnee", "Australia/Sydney"),
+])
+def test_partial_and_misspelt_names(city, zone):
+    assert lookup_timezone(city) == zone
+
+
+def test_partial_word_of_a_longer_name_is_not_a_match():
+    # "york" covers too little of "new york" to be trusted
+    assert rank_timezones("york") == []
+    assert lookup_timezone("york") is None
+
+
+def test_short_queries_are_never_fuzzy_matched():
+    assert rank_timezones("ab") == []
+    assert lookup_timezone("ab") is None
+
+
+def test_legacy_links_only_match_exactly():
+    assert lookup_timezone("poland") == "Poland"
+    assert lookup_timezone("polan") is None
+
+
+def test_ranking_is_best_first_and_above_threshold():
+    ranked = rank_timezones("londn")
+    assert ranked[0][0] == "Europe/London"
+    scores = [score for _, score in ranked]
+    assert scores == sorted(scores, reverse=True)
+    assert all(score >= FUZZY_MIN_SCORE for score in scores)
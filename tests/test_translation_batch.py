@@ -0,0 +1,63 @@
+import json
+
+from multi_tools_agent.tools.translation_batch import estimate_tokens, parse_batch_response, plan_batches
+
+
+def _response(entries) -> dict:
+    text = entries if isinstance(entries, str) else json.dumps(entries)
+    return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+
+def test_plan_batches_fits_everything_in_one_batch_under_budget():
+    texts = ["hello", "goodbye"]
+    items = [(0, "fr"), (0, "de"), (1, "fr")]
+    assert plan_batches(texts, items, token_budget=1000) == [items]
+
+
+def test_plan_batches_counts_a_source_text_once_per_batch():
+    texts = ["x" * 396]  # 100 tokens
+    assert estimate_tokens(texts[0]) == 100
+    items = [(0, "fr"), (0, "de"), (0, "es")]
+    # 200 for the first language (input + output), 100 for each further one
+    assert plan_batches(texts, items, token_budget=400) == [items]
+    assert plan_batches(texts, items, token_budget=399) == [[(0, "fr"), (0, "de")], [(0, "es")]]
+
+
+def test_plan_batches_gives_an_oversized_item_its_own_batch():
+    texts = ["short", "x" * 4000]
+    items = [(0, "fr"), (1, "fr"), (0, "de")]
+    assert plan_batches(texts, items, token_budget=100) == [[(0, "fr")], [(1, "fr")], [(0, "de")]]
+
+
+def test_plan_batches_without_items():
+    assert plan_batches(["hello"], []) == []
+
+
+def test_parse_batch_response_maps_requested_items():
+    batch = [(0, "French"), (1, "German")]
+    response = _response([
+        {"text_index": 1, "lang": "german", "translation": "Hallo"},
+        {"text_index": 0, "lang": " French ", "translation": "Bonjour"},
+    ])
+    assert parse_batch_response(response, batch) == {(0, "French"): "Bonjour", (1, "German"): "Hallo"}
+
+
+def test_parse_batch_response_skips_unrequested_and_malformed_entries():
+    batch = [(0, "fr"), (1, "fr")]
+    response = _response([
+        {"text_index": 0, "lang": "fr", "translation": "Bonjour"},
+        {"text_index": 2, "lang": "fr", "translation": "unrequested"},
+        {"text_index": "one", "lang": "fr", "translation": "bad index"},
+        {"text_index": 1, "lang": "fr", "translation": 42},
+        {"text_index": 1, "lang": "fr"},
+        "not an object",
+    ])
+    assert parse_batch_response(response, batch) == {(0, "fr"): "Bonjour"}
+
+
+def test_parse_batch_response_tolerates_broken_responses():
+    batch = [(0, "fr")]
+    assert parse_batch_response({}, batch) == {}
+    assert parse_batch_response({"candidates": []}, batch) == {}
+    assert parse_batch_response(_response("not json"), batch) == {}
+    assert parse_batch_response(_response({"text_index": 0}), batch) == {}
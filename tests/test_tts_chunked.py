@@ -0,0 +1,34 @@
+from multi_tools_agent.tools.tts_chunked import _strip_id3, split_sentences
+
+
+def test_split_sentences_packs_sentences_up_to_max_chars():
+    text = "One. Two! Three? Four."
+    assert split_sentences(text, max_chars=9) == ["One. Two!", "Three?", "Four."]
+    assert split_sentences(text, max_chars=100) == [text]
+
+
+def test_split_sentences_keeps_a_long_sentence_whole():
+    long_sentence = "This sentence is much longer than the limit."
+    assert split_sentences(f"Hi. {long_sentence} Bye.", max_chars=10) == ["Hi.", long_sentence, "Bye."]
+
+
+def test_split_sentences_handles_cjk_punctuation_and_whitespace():
+    assert split_sentences("  你好。 再见！  ", max_chars=3) == ["你好。", "再见！"]
+    assert split_sentences("   ", max_chars=10) == []
+
+
+def test_split_sentences_does_not_split_without_whitespace():
+    assert split_sentences("v1.2.3 is out", max_chars=5) == ["v1.2.3 is out"]
+
+
+def test_strip_id3_removes_the_tag_by_its_syncsafe_size():
+    # Syncsafe size 0x01 0x7f = (1 << 7) | 127 = 255 bytes of tag payload
+    tag = b"ID3\x04\x00\x00\x00\x00\x01\x7f" + b"\x00" * 255
+    frames = b"\xff\xfb\x90\x00frames"
+    assert _strip_id3(tag + frames) == frames
+
+
+def test_strip_id3_leaves_untagged_audio_alone():
+    frames = b"\xff\xfb\x90\x00frames"
+    assert _strip_id3(frames) == frames
+    assert _strip_id3(b"ID3") == b"ID3"
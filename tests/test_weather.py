@@ -0,0 +1,115 @@
+import asyncio
+from typing import Optional
+
+import pytest
+
+from multi_tools_agent.tools.weather import MockWeatherProvider, WeatherCache, WeatherProvider
+
+
+class SlowProvider(WeatherProvider):
+    """Counts fetches and holds each one until release is set."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def fetch(self, city_normalized: str) -> Optional[dict]:
+        self.calls += 1
+        await self.release.wait()
+        if city_normalized == "broken":
+            raise ValueError("provider failure")
+        return {"temp_c": 20, "condition": city_normalized}
+
+
+def test_provider_must_implement_fetch():
+    with pytest.raises(TypeError):
+        WeatherProvider()
+
+
+def test_hits_until_the_ttl_expires():
+    async def scenario():
+        cache = WeatherCache(MockWeatherProvider(), ttl=60)
+        assert await cache.get("london") == {"temp_c": 15, "condition": "cloudy"}
+        assert await cache.get("london") == {"temp_c": 15, "condition": "cloudy"}
+        assert await cache.get("atlantis") is None
+        assert await cache.get("atlantis") is None
+        return cache.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+
+
+def test_expired_entries_are_dropped_on_read():
+    async def scenario():
+        cache = WeatherCache(MockWeatherProvider(), ttl=0)
+        await cache.get("london")
+        await cache.get("london")
+        return cache.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (0, 2, 1)
+
+
+def test_concurrent_lookups_share_one_fetch():
+    async def scenario():
+        provider = SlowProvider()
+        cache = WeatherCache(provider, ttl=60)
+        lookups = [asyncio.ensure_future(cache.get("tokyo")) for _ in range(5)]
+        await asyncio.sleep(0)
+        provider.release.set()
+        results = await asyncio.gather(*lookups)
+        return provider.calls, results, cache.stats()
+
+    calls, results, stats = asyncio.run(scenario())
+    assert calls == 1
+    assert all(result == {"temp_c": 20, "condition": "tokyo"} for result in results)
+    assert (stats["misses"], stats["coalesced"]) == (1, 4)
+
+
+def test_cancelling_the_first_caller_does_not_fail_the_others():
+    async def scenario():
+        provider = SlowProvider()
+        cache = WeatherCache(provider, ttl=60)
+        leader = asyncio.ensure_future(cache.get("tokyo"))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.get("tokyo"))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        provider.release.set()
+        result = await follower
+        # The fetch completed and was cached despite the cancellation
+        cached = await cache.get("tokyo")
+        return leader.cancelled(), result, cached, provider.calls
+
+    leader_cancelled, result, cached, calls = asyncio.run(scenario())
+    assert leader_cancelled
+    assert result == cached == {"temp_c": 20, "condition": "tokyo"}
+    assert calls == 1
+
+
+def test_failed_fetch_reaches_every_caller_and_is_not_cached():
+    async def scenario():
+        provider = SlowProvider()
+        cache = WeatherCache(provider, ttl=60)
+        lookups = [asyncio.ensure_future(cache.get("broken")) for _ in range(2)]
+        await asyncio.sleep(0)
+        provider.release.set()
+        results = await asyncio.gather(*lookups, return_exceptions=True)
+        return results, cache.stats()["entries"], cache._in_flight
+
+    results, entries, in_flight = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert entries == 0 and not in_flight
+
+
+def test_cache_is_bounded_to_the_most_recently_used_cities():
+    async def scenario():
+        cache = WeatherCache(MockWeatherProvider(), ttl=60, max_entries=3)
+        for i in range(100):
+            await cache.get(f"nowhere{i}")
+        await cache.get("nowhere97")
+        await cache.get("london")
+        return list(cache._entries)
+
+    assert asyncio.run(scenario()) == ["nowhere99", "nowhere97", "london"]